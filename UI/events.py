@@ -0,0 +1,131 @@
+import os
+import time
+import queue
+from collections import deque, Counter
+from datetime import datetime
+
+LOG_DIR = os.path.join(".cache", "logs")
+
+
+class Tick:
+    # everything that arrived since the last drain, already coalesced
+    def __init__(self):
+        self.lines = {}  # channel -> [lines], in arrival order
+        self.latest = {}  # key -> last value, older progress updates are dropped
+        self.counts = Counter()  # counter name -> increments
+        self.events = []  # (name, data) that must each be handled (popups, state changes)
+
+    def __bool__(self):
+        return bool(self.lines or self.latest or self.counts or self.events)
+
+
+class EventBus:
+    # thread-safe producer side for the worker threads; the ui drains it once per tick
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def log(self, channel, line):
+        self._queue.put(('log', channel, line))
+
+    def progress(self, key, value):
+        self._queue.put(('progress', key, value))
+
+    def count(self, name, n=1):
+        self._queue.put(('count', name, n))
+
+    def post(self, name, data=None):
+        self._queue.put(('event', name, data))
+
+    def drain(self, limit=None):
+        # limit caps the work per tick, the rest waits for the next one
+        tick = Tick()
+        taken = 0
+        while limit is None or taken < limit:
+            try:
+                kind, key, value = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            taken += 1
+            if kind == 'log':
+                tick.lines.setdefault(key, []).append(value)
+            elif kind == 'progress':
+                tick.latest[key] = value
+            elif kind == 'count':
+                tick.counts[key] += value
+            else:
+                tick.events.append((key, value))
+        return tick
+
+
+class RateMeter:
+    # events per minute over a sliding window
+    def __init__(self, window=60.0):
+        self.window = window
+        self.reset()
+
+    def reset(self, now=None):
+        self.total = 0
+        self._marks = deque()
+        self._started = time.monotonic() if now is None else now
+
+    def add(self, n=1, now=None):
+        if not n: return
+        self.total += n
+        self._marks.append((time.monotonic() if now is None else now, n))
+
+    def per_minute(self, now=None):
+        now = time.monotonic() if now is None else now
+        while self._marks and now - self._marks[0][0] > self.window:
+            self._marks.popleft()
+        # before a full window has passed, divide by the time actually elapsed
+        span = min(self.window, max(now - self._started, 1.0))
+        return sum(n for _, n in self._marks) * 60.0 / span
+
+
+class LogView:
+    # textbox that only keeps the last max_lines lines; every line also goes to a spill file
+    def __init__(self, textbox, max_lines=1000, spill_dir=LOG_DIR, prefix="log"):
+        self.textbox = textbox
+        self.max_lines = max_lines
+        self.spill_dir = spill_dir
+        self.prefix = prefix
+        self.spill_path = None
+        self._spill = None
+        self._lines = 0
+
+    def clear(self, new_spill=True):
+        # starts a fresh view and, by default, a new spill file (one per hunt)
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        self.textbox.configure(state="disabled")
+        self._lines = 0
+        self.close()
+        if new_spill and self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self.spill_path = os.path.join(self.spill_dir, f"{self.prefix}_{datetime.now():%Y%m%d_%H%M%S}.log")
+            self._spill = open(self.spill_path, "a", encoding="utf-8")
+
+    def append(self, lines):
+        if not lines: return
+        if self._spill:
+            self._spill.write("\n".join(lines) + "\n")
+            self._spill.flush()
+
+        # a burst bigger than the view only needs its tail rendered
+        shown = lines[-self.max_lines:]
+        text = "\n".join(shown) + "\n"
+        self.textbox.configure(state="normal")
+        self.textbox.insert("end", text)
+        # text lines, not messages: a message can span several ("\nProbing niche...")
+        self._lines += text.count("\n")
+        excess = self._lines - self.max_lines
+        if excess > 0:
+            self.textbox.delete("1.0", f"{excess + 1}.0")
+            self._lines -= excess
+        self.textbox.see("end")
+        self.textbox.configure(state="disabled")
+
+    def close(self):
+        if self._spill:
+            self._spill.close()
+            self._spill = None
@@ -1,5 +1,3 @@
-import threading
-import queue
 import os
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
@@ -9,8 +7,15 @@ import config
 from config import WATERMARK_FILENAME
 
 # services
-from services.youtube import YoutubeProspector
-from services.audio import AudioProcessor, GroqService, SRTConverter
+from services.jobs import JobQueue, QueueBusy, DEFAULT_HANDLERS
+from services.backends import prewarm
+from services import telemetry
+from services.transcription import BACKENDS as TRANSCRIPTION_BACKENDS, LOCAL_MODELS
+from UI.events import EventBus, RateMeter, LogView
+
+# ui refresh period and the most bus events handled per refresh
+TICK_MS = 100
+TICK_EVENT_LIMIT = 5000
 
 class UnifiedApp(ctk.CTk):
     def __init__(self, video_processor):
@@ -24,7 +29,21 @@ class UnifiedApp(ctk.CTk):
 
         self.video_path_subtitle = ctk.StringVar()
         self.api_key = ctk.StringVar(value=os.getenv("GROQ_API_KEY", ""))
-        self.msg_queue = queue.Queue() 
+        self.transcriber = ctk.StringVar(value=config.TRANSCRIPTION_BACKEND)
+        self.whisper_model = ctk.StringVar(value=config.WHISPER_MODEL)
+        # worker threads publish here, check_queue renders everything once per tick
+        self.events = EventBus()
+        self.leads_meter = RateMeter()
+        self.probed_meter = RateMeter()
+        if config.TELEMETRY:
+            telemetry.enable()
+        # every tab submits here; the journal keeps unfinished jobs across restarts
+        try:
+            self.jobs = JobQueue(DEFAULT_HANDLERS, on_event=self.on_job_event)
+        except QueueBusy:
+            # a worker.py run owns the journal: jobs from this window still run, they just aren't journaled
+            self.jobs = JobQueue(DEFAULT_HANDLERS, journal_path=None, on_event=self.on_job_event)
+            self.after(0, lambda: messagebox.showwarning("Warning", "worker.py is running the job queue: jobs queued here won't resume after a restart."))
 
         self.tabview = ctk.CTkTabview(self)
         self.tabview.pack(padx=20, pady=10, fill="both", expand=True)
@@ -37,7 +56,48 @@ class UnifiedApp(ctk.CTk):
         self.create_subtitle_tab()
         self.create_prospector_tab()
 
+        self.jobs.start()
         self.check_queue()
+        if config.PREWARM_BACKENDS:
+            # after the first frames are drawn, the window shows up before numpy/moviepy/yt-dlp load
+            self.after(500, prewarm)
+
+    # runs on the job threads, the ui is only touched from check_queue
+    def on_job_event(self, job, event, data):
+        kind = job['kind']
+        if event == 'log':
+            self.events.log('pros', data)
+        elif event == 'lead':
+            self.events.count('leads')
+        elif event == 'probed':
+            self.events.count('probed')
+        elif event == 'encode':
+            # only the last one per tick is drawn
+            self.events.progress('encode', data)
+        elif event != 'state':
+            return
+        elif kind == 'watermark' and data == 'done':
+            extra = f" + {os.path.basename(job['result']['output_path'])}" if job['result'].get('output_path') else ""
+            self.events.post("watermark_ok", f"Completed: {os.path.basename(job['payload']['video_path'])}{extra}")
+        elif kind == 'watermark' and data == 'failed':
+            self.events.post("watermark_error", job['error'])
+        elif kind == 'subtitle' and data == 'running':
+            self.events.post("subtitle_start")
+        elif kind == 'subtitle' and data == 'done':
+            self.events.post("subtitle_ok", f"Subtitle saved: {job['result']['output_path']}")
+        elif kind == 'subtitle' and data == 'failed':
+            self.events.post("subtitle_error", job['error'])
+        elif kind == 'hunt' and data == 'failed':
+            self.events.log('pros', f"FATAL ERROR: {job['error']}")
+            self.events.post("end_pros")
+        elif kind == 'hunt' and data in ('done', 'cancelled'):
+            self.events.post("end_pros")
+        if event == 'state':
+            self.events.progress('jobs', None)
+
+    def pending_jobs(self, kind):
+        counts = self.jobs.counts().get(kind, {})
+        return counts.get('queued', 0) + counts.get('running', 0)
 
     # tab 1 - watermark
     def create_watermark_tab(self):
@@ -56,6 +116,17 @@ class UnifiedApp(ctk.CTk):
         self.entry_wm.pack(side="left", fill="x", expand=True, padx=(0, 10))
         ctk.CTkButton(frame_wm, text="Select", width=80, command=self.select_watermark_file).pack(side="right")
 
+        # watermark engine (ffmpeg is much faster on long videos)
+        frame_engine = ctk.CTkFrame(frame, fg_color="transparent")
+        frame_engine.pack(fill="x", pady=(0, 10))
+        ctk.CTkLabel(frame_engine, text="Engine:").pack(side="left", padx=(0, 5))
+        self.watermark_engine = ctk.StringVar(value=self.video_processor.engine)
+        ctk.CTkOptionMenu(frame_engine, variable=self.watermark_engine, values=list(self.video_processor.ENGINES)).pack(side="left")
+
+        # one decode for both: the subtitles are transcribed while the watermark encodes
+        self.watermark_subtitles = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(frame, text="Also generate subtitles (single pass, uses the Whisper Subtitles settings)", variable=self.watermark_subtitles).pack(pady=(0, 10))
+
         self.btn_watermark = ctk.CTkButton(frame, text="Select Video and Process", command=self.start_watermark_thread, height=40)
         self.btn_watermark.pack(pady=20, padx=50, fill="x")
 
@@ -76,17 +147,26 @@ class UnifiedApp(ctk.CTk):
 
         # updates video_processor BEFORE processing
         self.video_processor.watermark_image_path = self.watermark_path.get()
+        self.video_processor.engine = self.watermark_engine.get()
+
+        payload = {
+            'video_path': os.path.abspath(video_path),
+            'watermark_path': os.path.abspath(self.watermark_path.get()),
+            'engine': self.watermark_engine.get(),
+        }
+        secrets = None
+        if self.watermark_subtitles.get():
+            key = self.api_key.get().strip()
+            if self.transcriber.get() == 'groq' and not key:
+                messagebox.showwarning("Warning", "API Key required (Whisper Subtitles tab).")
+                return
+            payload['subtitles'] = ['srt'] + (['vtt'] if self.write_vtt.get() else []) + (['json'] if self.write_json.get() else [])
+            payload.update(self.transcriber_payload())
+            secrets = {'api_key': key}
 
-        self.btn_watermark.configure(state="disabled", text="Processing...")
-        self.lbl_status_watermark.configure(text="Applying overlay... (This may take a while)", text_color="blue")
-        threading.Thread(target=self.process_watermark_background, args=(video_path,), daemon=True).start()
-
-    def process_watermark_background(self, video_path):
-        success, error = self.video_processor.apply_watermark(video_path)
-        if success:
-            self.msg_queue.put(("watermark_ok", "Completed successfully!"))
-        else:
-            self.msg_queue.put(("watermark_error", str(error)))
+        # the button stays usable, more videos just queue up behind this one
+        self.jobs.submit('watermark', payload, secrets=secrets)
+        self.update_job_status()
 
     # tab 2 - subtitles
     def create_subtitle_tab(self):
@@ -99,6 +179,14 @@ class UnifiedApp(ctk.CTk):
         self.entry_key = ctk.CTkEntry(frame_api, textvariable=self.api_key, show="*")
         self.entry_key.pack(fill="x", pady=(5,0))
 
+        # groq uploads the audio; local runs whisper on this machine (offline, needs faster-whisper)
+        frame_backend = ctk.CTkFrame(main_frame, fg_color="transparent")
+        frame_backend.pack(fill="x", padx=10, pady=(5, 0))
+        ctk.CTkLabel(frame_backend, text="Backend:").pack(side="left", padx=(0, 5))
+        ctk.CTkOptionMenu(frame_backend, variable=self.transcriber, values=list(TRANSCRIPTION_BACKENDS), width=100).pack(side="left", padx=(0, 10))
+        ctk.CTkLabel(frame_backend, text="Local model:").pack(side="left", padx=(0, 5))
+        ctk.CTkOptionMenu(frame_backend, variable=self.whisper_model, values=list(LOCAL_MODELS), width=130).pack(side="left")
+
         frame_file = ctk.CTkFrame(main_frame, fg_color="transparent")
         frame_file.pack(fill="x", padx=10, pady=10)
         ctk.CTkLabel(frame_file, text="Video File:").pack(anchor="w")
@@ -109,6 +197,14 @@ class UnifiedApp(ctk.CTk):
         self.entry_path.pack(side="left", fill="x", expand=True, padx=(0, 10))
         ctk.CTkButton(frame_input, text="Search", width=80, command=self.browse_subtitle_video).pack(side="right")
 
+        # extra formats written in the same pass as the .srt
+        frame_formats = ctk.CTkFrame(main_frame, fg_color="transparent")
+        frame_formats.pack(fill="x", padx=10)
+        self.write_vtt = ctk.BooleanVar(value=False)
+        self.write_json = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(frame_formats, text="Also save WebVTT (.vtt)", variable=self.write_vtt).pack(side="left", padx=(0, 10))
+        ctk.CTkCheckBox(frame_formats, text="Also save JSON sidecar", variable=self.write_json).pack(side="left")
+
         self.btn_convert = ctk.CTkButton(main_frame, text="GENERATE SUBTITLES", command=self.start_subtitle_thread, state="disabled", height=40)
         self.btn_convert.pack(pady=15, padx=50, fill="x")
         
@@ -127,27 +223,21 @@ class UnifiedApp(ctk.CTk):
         self.btn_convert.configure(state=state)
         self.entry_key.configure(state=state)
 
+    def transcriber_payload(self):
+        return {'backend': self.transcriber.get(), 'model': self.whisper_model.get(), 'threads': config.WHISPER_THREADS,
+                'compute_type': config.WHISPER_COMPUTE_TYPE}
+
     def start_subtitle_thread(self):
         key = self.api_key.get().strip()
         vid = self.video_path_subtitle.get()
-        if not key:
+        if self.transcriber.get() == 'groq' and not key:
             messagebox.showwarning("Warning", "API Key required.")
             return
-        threading.Thread(target=self.process_video_subtitle, args=(key, vid), daemon=True).start()
-
-    def process_video_subtitle(self, api_key, video_path):
-        self.msg_queue.put(("subtitle_start", None))
-        temp_audio = "temp_audio_extract.mp3"
-        try:
-            AudioProcessor.extract_audio(video_path, temp_audio)
-            result = GroqService.transcribe(api_key, temp_audio)
-            output_path = f"{os.path.splitext(video_path)[0]}.srt"
-            SRTConverter.save_srt(result.segments, output_path) # type: ignore
-            self.msg_queue.put(("subtitle_ok", f"Subtitle saved: {output_path}"))
-        except Exception as e:
-            self.msg_queue.put(("subtitle_error", str(e)))
-        finally:
-            if os.path.exists(temp_audio): os.remove(temp_audio)
+        formats = ['srt'] + (['vtt'] if self.write_vtt.get() else []) + (['json'] if self.write_json.get() else [])
+        payload = {'video_path': os.path.abspath(vid), 'formats': formats, **self.transcriber_payload()}
+        # the key only lives in memory, it is never written to the job journal
+        self.jobs.submit('subtitle', payload, secrets={'api_key': key})
+        self.update_job_status()
 
     # tab 3 - prospector (i dont know why i didnt gave this a beter name)
     def create_prospector_tab(self):
@@ -168,6 +258,8 @@ class UnifiedApp(ctk.CTk):
         self.input_views_max = self.create_input(panel_config, "Maximum:", "70000")
 
         self.input_goal = self.create_input(panel_config, "Lead Goal:", "20")
+        # upper bound only, terms that stop paying off are dropped earlier
+        self.input_term_limit = self.create_input(panel_config, "Max Results/Term:", "100")
 
         # right Panel (Terms and Log)
         panel_main = ctk.CTkFrame(self.frame_pros, fg_color="transparent")
@@ -187,6 +279,11 @@ class UnifiedApp(ctk.CTk):
         ctk.CTkLabel(panel_main, text="Execution Log:", anchor="w").pack(fill="x")
         self.txt_log = ctk.CTkTextbox(panel_main, state="disabled")
         self.txt_log.pack(fill="both", expand=True)
+        # only the tail stays on screen, the whole log goes to .cache/logs
+        self.log_view = LogView(self.txt_log, max_lines=1000, prefix="hunt")
+
+        self.lbl_hunt_stats = ctk.CTkLabel(panel_main, text="", anchor="w", text_color="gray")
+        self.lbl_hunt_stats.pack(fill="x")
 
     def create_input(self, parent, label, default):
         ctk.CTkLabel(parent, text=label).pack(pady=(5,0))
@@ -195,9 +292,6 @@ class UnifiedApp(ctk.CTk):
         entry.insert(0, default)
         return entry
 
-    def log_prospector(self, msg):
-        self.msg_queue.put(("log_pros", msg))
-
     def start_prospector_thread(self):
         try:
             # capture inputs
@@ -207,7 +301,8 @@ class UnifiedApp(ctk.CTk):
                 'views_max': int(self.input_views_max.get()),
                 'duration_min': 120, 
                 'duration_max': 7200, 
-                'search_limit_per_term': 30,
+                'search_limit_per_term': int(self.input_term_limit.get()),
+                'concurrent_terms': 3,
                 'total_goal': int(self.input_goal.get())
             }
             terms_raw = self.txt_terms.get("1.0", "end").strip()
@@ -218,68 +313,72 @@ class UnifiedApp(ctk.CTk):
                 return
 
             self.btn_search.configure(state="disabled", text="Hunting...")
-            self.txt_log.configure(state="normal")
-            self.txt_log.delete("1.0", "end")
-            self.txt_log.configure(state="disabled")
+            self.log_view.clear()
+            self.leads_meter.reset()
+            self.probed_meter.reset()
+            self.update_hunt_stats()
 
-            # instantiate using the imported class
-            self.prospector_instance = YoutubeProspector(config_params, self.log_prospector)
-            threading.Thread(target=self.run_prospector, args=(terms,), daemon=True).start()
+            # the hunt handler keeps one metadata cache and lead store for the whole session
+            self.jobs.submit('hunt', {'config': config_params, 'terms': terms})
 
         except ValueError:
-            messagebox.showerror("Error", "Ensure numeric fields (Views/Days/Goal) contain only numbers.")
-
-    def run_prospector(self, terms):
-        try:
-            self.prospector_instance.search(terms)
-            self.msg_queue.put(("end_pros", None))
-        except Exception as e:
-            self.msg_queue.put(("log_pros", f"FATAL ERROR: {e}"))
-            self.msg_queue.put(("end_pros", None))
-
-    # queue manager
+            messagebox.showerror("Error", "Ensure numeric fields (Views/Days/Goal/Max Results) contain only numbers.")
+
+    def update_job_status(self):
+        watermarks = self.pending_jobs('watermark')
+        if watermarks:
+            self.lbl_status_watermark.configure(text=f"Applying overlay... {watermarks} video(s) in the queue", text_color="blue")
+        subtitles = self.pending_jobs('subtitle')
+        if subtitles:
+            action = "Sending audio to Groq API..." if self.transcriber.get() == 'groq' else "Transcribing locally..."
+            self.lbl_status_subtitle.configure(text=f"{action} {subtitles} video(s) in the queue", text_color="blue")
+
+    def update_hunt_stats(self):
+        self.lbl_hunt_stats.configure(text=f"Leads: {self.leads_meter.total} ({self.leads_meter.per_minute():.1f}/min)"
+                                           f"  |  Videos probed: {self.probed_meter.total} ({self.probed_meter.per_minute():.0f}/min)")
+
+    # queue manager: one coalesced batch of events per tick, however fast the workers publish
     def check_queue(self):
         try:
-            while True:
-                msg_type, data = self.msg_queue.get_nowait()
-                
+            tick = self.events.drain(TICK_EVENT_LIMIT)
+            self.log_view.append(tick.lines.get('pros'))
+
+            if tick.counts or self.btn_search.cget("state") == "disabled":
+                self.leads_meter.add(tick.counts['leads'])
+                self.probed_meter.add(tick.counts['probed'])
+                self.update_hunt_stats()
+            if 'jobs' in tick.latest:
+                self.update_job_status()
+            encode = tick.latest.get('encode')
+            if encode and self.pending_jobs('watermark'):
+                self.lbl_status_watermark.configure(text=f"Encoding... frame {encode['frames']} @ {encode['fps']:.1f} fps", text_color="blue")
+
+            for msg_type, data in tick.events:
                 if msg_type == "watermark_ok":
                     self.lbl_status_watermark.configure(text=data, text_color="green")
                     messagebox.showinfo("Success", "Watermark applied!")
-                    self.btn_watermark.configure(state="normal", text="Select Video and Process")
                 elif msg_type == "watermark_error":
                     self.lbl_status_watermark.configure(text="Error", text_color="red")
                     messagebox.showerror("Error", data)
-                    self.btn_watermark.configure(state="normal", text="Select Video and Process")
                 
                 elif msg_type == "subtitle_start":
-                    self.toggle_subtitle_inputs(False)
                     self.progress.pack(fill="x", padx=20, pady=5)
                     self.progress.start()
-                    self.lbl_status_subtitle.configure(text="Sending audio to Groq API...", text_color="blue")
                 elif msg_type == "subtitle_ok":
                     self.lbl_status_subtitle.configure(text="Finished!", text_color="green")
                     messagebox.showinfo("Success", data)
-                    self.progress.stop()
-                    self.progress.pack_forget()
-                    self.toggle_subtitle_inputs(True)
+                    if not self.pending_jobs('subtitle'):
+                        self.progress.stop()
+                        self.progress.pack_forget()
                 elif msg_type == "subtitle_error":
                     self.lbl_status_subtitle.configure(text="Error", text_color="red")
                     messagebox.showerror("Error", data)
-                    self.progress.stop()
-                    self.progress.pack_forget()
-                    self.toggle_subtitle_inputs(True)
+                    if not self.pending_jobs('subtitle'):
+                        self.progress.stop()
+                        self.progress.pack_forget()
                 
-                elif msg_type == "log_pros":
-                    self.txt_log.configure(state="normal")
-                    self.txt_log.insert("end", data + "\n")
-                    self.txt_log.see("end")
-                    self.txt_log.configure(state="disabled")
                 elif msg_type == "end_pros":
                     self.btn_search.configure(state="normal", text="START HUNT")
                     messagebox.showinfo("Finished", "Search finished! Check 'youtube_leads.csv'")
-
-        except queue.Empty:
-            pass
         finally:
-            self.after(100, self.check_queue)
\ No newline at end of file
+            self.after(TICK_MS, self.check_queue)
@@ -0,0 +1,259 @@
+import os
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import config
+from config import WATERMARK_FILENAME
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov')
+
+
+def collect_videos(targets):
+    # each target can be a folder, a glob pattern or a single file
+    found = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths = [os.path.join(target, name) for name in sorted(os.listdir(target))]
+        else:
+            paths = sorted(glob.glob(target))
+        for path in paths:
+            if os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS) and path not in found:
+                found.append(path)
+    return found
+
+
+def output_for(video_path, output_dir=None):
+    return os.path.join(output_dir, os.path.basename(video_path)) if output_dir else video_path
+
+
+def output_clashes(videos, output_dir):
+    # {output: [sources]} for sources from different folders that would land on the same output file
+    targets = {}
+    for video in videos:
+        targets.setdefault(os.path.abspath(output_for(video, output_dir)), []).append(video)
+    return {output: sources for output, sources in targets.items() if len(sources) > 1}
+
+
+def transcription_backend(transcriber=None):
+    # transcriber: keyword arguments for services.transcription.get_backend (name, model_size, threads)
+    from services.transcription import get_backend
+    return get_backend(api_key=os.getenv("GROQ_API_KEY", ""), **(transcriber or {}))
+
+
+def job_settings(watermark_path, settings, subtitles=None, transcriber=None):
+    # what goes into the manifest fingerprint: everything that changes the outputs.
+    # engine, threads and segments only change how the encode runs, not what it produces
+    from services.cache import file_digest
+    from services.video import VideoProcessor
+
+    processor = VideoProcessor(watermark_path, **settings)
+    result = {'watermark': file_digest(watermark_path), 'opacity': processor.opacity, 'preset': processor.preset, 'crf': processor.crf}
+    if subtitles:
+        backend = transcription_backend(transcriber)
+        result['subtitles'] = {'formats': sorted(subtitles), 'model': backend.model_id, 'language': backend.language}
+    return result
+
+
+def watermark_worker(video_path, watermark_path, settings, subtitles=None, trace=False, output_path=None, transcriber=None):
+    # runs inside the pool, so the processor is built per process
+    from services.video import VideoProcessor
+    from services.cache import file_digest
+    from services import telemetry
+
+    if trace and not telemetry.enabled():
+        # every worker appends to the same trace, the parent writes the metrics
+        telemetry.enable(metrics_path=None)
+
+    start = time.perf_counter()
+    processor = VideoProcessor(watermark_path, **settings)
+    if subtitles:
+        # single decode: subtitles are transcribed while the watermark encodes
+        from services.pipeline import watermark_and_subtitle
+        try:
+            watermark_and_subtitle(processor, None, video_path, formats=tuple(subtitles), output_path=output_path,
+                                   backend=transcription_backend(transcriber))
+            success, error = True, None
+        except Exception as e:
+            success, error = False, str(e)
+    else:
+        success, error = processor.apply_watermark(video_path, output_path)
+    # hashed here so the parent doesn't read every output again
+    output_hash = file_digest(output_path or video_path) if success else None
+    return video_path, success, error, time.perf_counter() - start, output_hash
+
+
+def restore_subtitles(video_path, manifest, settings, cache=None):
+    # an in-place file whose subtitles went missing: the video must not be encoded again, so the
+    # subtitles are rewritten from the transcription cached under the original content. False if it's not cached
+    from services.audio import SubtitleWriter
+    from services.subtitles import default_cache
+
+    cache = cache or default_cache()
+    entry = manifest.entry(video_path)
+    options = settings['subtitles']
+    segments = cache.get(cache.key_for_hash(entry['source_hash'], options['model'], options['language']))
+    if segments is None:
+        return False
+    with SubtitleWriter(SubtitleWriter.outputs_for(video_path, options['formats'])) as writer:
+        writer.write_all(segments)
+    return True
+
+
+def plan_batch(videos, manifest, settings, output_dir=None, force=False, log=print):
+    # drops what the manifest says is done; returns the videos left to process
+    from services import manifest as states
+
+    todo = []
+    for video in videos:
+        status = states.PENDING if force else manifest.check(video, output_for(video, output_dir), settings)
+        if status == states.CURRENT:
+            log(f"[SKIP] {video}: up to date")
+        elif status == states.LOCKED:
+            log(f"[SKIP] {video}: already watermarked in place with other settings "
+                f"(use --output-dir to keep the originals, or --force)")
+        elif status == states.SUBTITLES:
+            if restore_subtitles(video, manifest, settings):
+                log(f"[SKIP] {video}: up to date, missing subtitles rewritten from the transcription cache")
+            else:
+                log(f"[SKIP] {video}: subtitles missing but the original is gone and its transcription isn't cached "
+                    f"(use --force to process the watermarked file again)")
+        else:
+            todo.append(video)
+    return todo
+
+
+def run_batch(videos, watermark_path, workers, settings=None, log=print, subtitles=None, trace=False,
+              output_dir=None, manifest=None, force=False, transcriber=None):
+    # with a manifest, finished files are skipped and each success is recorded as soon as it's done,
+    # so an interrupted batch picks up where it stopped
+    settings = settings or {}
+    failures = 0
+    start = time.perf_counter()
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    fingerprint = source_hashes = None
+    skipped = 0
+    if manifest is not None:
+        from services.cache import file_digest
+        from services.audio import SubtitleWriter
+
+        fingerprint = job_settings(watermark_path, settings, subtitles, transcriber)
+        skipped = len(videos)
+        videos = plan_batch(videos, manifest, fingerprint, output_dir, force, log)
+        skipped -= len(videos)
+        # taken before processing, an in-place run overwrites the source
+        with ThreadPoolExecutor(max_workers=4) as hashers:
+            source_hashes = dict(zip(videos, hashers.map(file_digest, videos)))
+        subtitle_paths = lambda video: list(SubtitleWriter.outputs_for(output_for(video, output_dir), subtitles).values()) if subtitles else []
+        for video in videos:
+            manifest.begin(video, source_hashes[video], output_for(video, output_dir), fingerprint, subtitle_paths(video))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(watermark_worker, path, watermark_path, settings, subtitles, trace, output_for(path, output_dir), transcriber)
+                   for path in videos]
+        for future in as_completed(futures):
+            try:
+                video_path, success, error, elapsed, output_hash = future.result()
+            except Exception as e:
+                # worker died (segfault, oom...), nothing else to report
+                failures += 1
+                log(f"[FAIL] worker crashed: {e}")
+                continue
+
+            if success:
+                log(f"[OK]   {video_path} ({elapsed:.1f}s)")
+                if manifest is not None:
+                    output_path = output_for(video_path, output_dir)
+                    manifest.record(video_path, source_hashes[video_path], output_path, fingerprint,
+                                    subtitle_paths(video_path), output_hash)
+            else:
+                failures += 1
+                log(f"[FAIL] {video_path} ({elapsed:.1f}s): {error}")
+                if manifest is not None:
+                    # the output is only replaced once complete, so a failed file is untouched
+                    manifest.forget(video_path)
+
+    total = time.perf_counter() - start
+    done = len(videos) - failures
+    log("-" * 40)
+    log(f"{done}/{len(videos)} files watermarked in {total:.1f}s")
+    if manifest is not None and skipped:
+        log(f"{skipped} files skipped")
+    if total > 0 and videos:
+        log(f"Throughput: {len(videos) / total * 60:.1f} files/min")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply the watermark to many videos without the GUI.")
+    parser.add_argument('targets', nargs='+', help="video files, folders or glob patterns (quote the globs)")
+    parser.add_argument('-w', '--watermark', default=WATERMARK_FILENAME, help="watermark image (default: %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1, help="parallel processes (default: %(default)s)")
+    parser.add_argument('--engine', choices=('moviepy', 'ffmpeg'), default='moviepy', help="watermark engine (default: %(default)s)")
+    parser.add_argument('--preset', default='medium', help="libx264 preset (default: %(default)s)")
+    parser.add_argument('--crf', type=int, default=23, help="libx264 CRF (default: %(default)s)")
+    parser.add_argument('--threads', type=int, default=None, help="encoder threads per file (default: encoder decides)")
+    parser.add_argument('--segments', type=int, default=1, help="split each file at keyframes and encode this many pieces in parallel")
+    parser.add_argument('--trace', action='store_true', help="write stage timings to .cache/trace.jsonl and .cache/metrics.prom")
+    parser.add_argument('--subtitles', nargs='+', choices=('srt', 'vtt', 'json'), default=None,
+                        help="also write subtitles in the same pass (needs GROQ_API_KEY with the groq backend)")
+    parser.add_argument('--transcriber', choices=('groq', 'local'), default=config.TRANSCRIPTION_BACKEND,
+                        help="subtitle backend, local runs whisper on the cpu and needs faster-whisper (default: %(default)s)")
+    parser.add_argument('--whisper-model', default=config.WHISPER_MODEL, help="local model size (default: %(default)s)")
+    parser.add_argument('--whisper-threads', type=int, default=config.WHISPER_THREADS,
+                        help="local cpu threads per file (default: the cores divided between the workers)")
+    parser.add_argument('-o', '--output-dir', default=None, help="write the results here instead of replacing the sources")
+    parser.add_argument('--force', action='store_true', help="process every file, even the ones the manifest lists as done")
+    parser.add_argument('--manifest', default=None, help="processing manifest (default: .cache/manifest.json)")
+    parser.add_argument('--no-manifest', action='store_true', help="don't read or write the manifest")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.watermark):
+        print(f"Image '{args.watermark}' not found.")
+        return 2
+
+    videos = collect_videos(args.targets)
+    if not videos:
+        print("No videos found.")
+        return 1
+
+    if args.output_dir and os.path.abspath(args.output_dir) in {os.path.dirname(os.path.abspath(v)) for v in videos}:
+        print("--output-dir must be another folder, the results would replace the sources.")
+        return 2
+    clashes = output_clashes(videos, args.output_dir) if args.output_dir else {}
+    for output, sources in clashes.items():
+        print(f"{', '.join(sources)} would all be written to '{output}'.")
+    if clashes:
+        print("Rename them or run the folders separately with different --output-dir.")
+        return 2
+
+    print(f"Watermarking {len(videos)} files with {args.workers} workers...")
+    settings = {'engine': args.engine, 'preset': args.preset, 'crf': args.crf, 'threads': args.threads, 'segments': max(1, args.segments)}
+    if args.subtitles and args.transcriber == 'groq' and not os.getenv("GROQ_API_KEY"):
+        print("--subtitles needs GROQ_API_KEY in the environment (or --transcriber local).")
+        return 2
+    transcriber = {'name': args.transcriber}
+    if args.transcriber == 'local':
+        # every worker loads its own model, so they split the cores instead of each taking all of them
+        threads = args.whisper_threads or max(1, (os.cpu_count() or 1) // max(1, args.workers))
+        transcriber.update(model_size=args.whisper_model, threads=threads, compute_type=config.WHISPER_COMPUTE_TYPE)
+    manifest = None
+    if not args.no_manifest:
+        from services.manifest import Manifest, MANIFEST_PATH
+        manifest = Manifest(args.manifest or MANIFEST_PATH)
+    started = time.time()
+    failures = run_batch(videos, args.watermark, max(1, args.workers), settings, subtitles=args.subtitles, trace=args.trace,
+                         output_dir=args.output_dir, manifest=manifest, force=args.force, transcriber=transcriber)
+    if args.trace:
+        from services import telemetry
+        path = telemetry.write_metrics(telemetry.METRICS_PATH, spans=telemetry.summarize(telemetry.TRACE_PATH, since=started))
+        print(f"Trace: {telemetry.TRACE_PATH}, metrics: {path}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import time
+import platform
+import multiprocessing
+
+# keep the generated media out of the way, it's reused between runs
+WORK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".bench")
+
+RESOLUTIONS = {
+    '480p': (854, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+}
+
+
+def work_path(*parts):
+    os.makedirs(WORK_DIR, exist_ok=True)
+    return os.path.join(WORK_DIR, *parts)
+
+
+def synthetic_video(resolution, duration, fps=30, gop=None):
+    # testsrc2 has enough motion/detail to keep the encoder honest; gop sets the keyframe interval in frames
+    from services import ffmpeg
+
+    width, height = RESOLUTIONS[resolution]
+    path = work_path(f"src_{resolution}_{duration}s" + (f"_g{gop}" if gop else "") + ".mp4")
+    if os.path.exists(path):
+        return path
+
+    args = [
+        '-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+        '-f', 'lavfi', '-i', f"sine=frequency=440:sample_rate=44100:duration={duration}",
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', *(['-g', str(gop)] if gop else []),
+        '-c:a', 'aac', '-shortest', path,
+    ]
+    if ffmpeg.run(args).returncode != 0:
+        raise Exception("Could not generate the synthetic video. Check if FFmpeg is installed and in PATH.")
+    return path
+
+
+def synthetic_watermark():
+    import PIL.Image
+    import PIL.ImageDraw
+
+    path = work_path("watermark.png")
+    if os.path.exists(path):
+        return path
+
+    # mostly transparent, like a real logo
+    img = PIL.Image.new('RGBA', (1280, 720), (0, 0, 0, 0))
+    draw = PIL.ImageDraw.Draw(img)
+    draw.rectangle((440, 260, 840, 460), fill=(255, 255, 255, 200))
+    draw.ellipse((540, 290, 740, 430), fill=(200, 30, 30, 255))
+    img.save(path)
+    return path
+
+
+def synthetic_segments(count, seconds_per_segment=3.0):
+    words = "the quick brown fox jumps over the lazy dog while the camera keeps rolling".split()
+    segments = []
+    for i in range(count):
+        start = i * seconds_per_segment
+        text = " ".join(words[(i + j) % len(words)] for j in range(8))
+        segments.append({'id': i, 'start': start, 'end': start + seconds_per_segment - 0.2, 'text': f" {text}"})
+    return segments
+
+
+def peak_rss_mb():
+    # peak of this process plus any ffmpeg it waited for; None where resource isn't available (windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in bytes on macos and in kilobytes everywhere else
+    to_mb = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / to_mb, 1)
+
+
+def _measure_child(conn, func, args):
+    try:
+        start = time.perf_counter()
+        extra = func(*args) or {}
+        wall = time.perf_counter() - start
+        if extra.get('frames'):
+            extra['fps'] = round(extra['frames'] / wall, 2)
+        conn.send({'wall_time': round(wall, 4), 'peak_rss_mb': peak_rss_mb(), **extra})
+    except Exception as e:
+        conn.send({'error': str(e)})
+    finally:
+        conn.close()
+
+
+def measure(func, *args):
+    # every stage runs in a fresh process so peak RSS belongs to that stage alone
+    ctx = multiprocessing.get_context('spawn')
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_measure_child, args=(child, func, args))
+    process.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {'error': f"benchmark process died (exit code {process.exitcode})"}
+    process.join()
+    return result
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def save_results(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+# metric -> True when bigger is better
+METRICS = {'wall_time': False, 'peak_rss_mb': False, 'fps': True}
+
+
+def compare(current, baseline, tolerance):
+    regressions = []
+    base_by_name = {r['name']: r for r in baseline}
+    for result in current:
+        base = base_by_name.get(result['name'])
+        if not base or 'error' in result or 'error' in base:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            new, old = result.get(metric), base.get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                regressions.append((result['name'], metric, old, new, change))
+    return regressions
+
+
+def print_table(results):
+    print(f"{'stage':<40} {'wall (s)':>10} {'fps':>10} {'rss (MB)':>10}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['name']:<40} ERROR: {r['error']}")
+            continue
+        fps = f"{r['fps']:.1f}" if r.get('fps') else '-'
+        rss = f"{r['peak_rss_mb']:.1f}" if r.get('peak_rss_mb') else '-'
+        print(f"{r['name']:<40} {r['wall_time']:>10.3f} {fps:>10} {rss:>10}")
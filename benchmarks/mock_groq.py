@@ -0,0 +1,114 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# stand-in for the groq transcription endpoint, point the client at it with
+#   GroqService.transcribe(..., base_url="http://127.0.0.1:8765") or GROQ_BASE_URL
+ENDPOINT = "/openai/v1/audio/transcriptions"
+# the app uploads 32kbps mp3, so the body size is a good enough duration estimate
+BYTES_PER_SECOND = 4000
+SEGMENT_SECONDS = 5.0
+
+
+def fake_segments(duration):
+    segments = []
+    start = 0.0
+    while start < duration:
+        end = min(start + SEGMENT_SECONDS, duration)
+        segments.append({'id': len(segments), 'start': round(start, 2), 'end': round(end, 2),
+                         'text': f" segment {len(segments)} at {start:.0f} seconds"})
+        start = end
+    return segments
+
+
+class MockGroqHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    # fraction of requests answered with 429 / 503 to exercise the client's retries
+    rate_limit_rate = 0.0
+    error_rate = 0.0
+    retry_after = 1
+    requests = 0
+    rejected = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path != ENDPOINT:
+            return self._reply(404, {'error': {'message': 'not found'}})
+
+        with MockGroqHandler.lock:
+            MockGroqHandler.requests += 1
+
+        time.sleep(self.latency)
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            with MockGroqHandler.lock:
+                MockGroqHandler.rejected += 1
+            return self._reply(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}}, {
+                'retry-after': str(self.retry_after),
+                'x-ratelimit-remaining-requests': '0',
+                'x-ratelimit-reset-requests': f"{self.retry_after}s",
+            })
+        if roll < self.rate_limit_rate + self.error_rate:
+            with MockGroqHandler.lock:
+                MockGroqHandler.rejected += 1
+            return self._reply(503, {'error': {'message': 'Service unavailable'}})
+
+        duration = len(body) / BYTES_PER_SECOND
+        segments = fake_segments(duration)
+        self._reply(200, {
+            'task': 'transcribe',
+            'language': 'english',
+            'duration': duration,
+            'text': "".join(s['text'] for s in segments),
+            'segments': segments,
+        }, {'x-ratelimit-remaining-requests': '100', 'x-ratelimit-reset-requests': '10s'})
+
+
+def serve(host='127.0.0.1', port=8765, latency=0.0, rate_limit_rate=0.0, error_rate=0.0, handler=MockGroqHandler):
+    handler.latency = latency
+    handler.rate_limit_rate = rate_limit_rate
+    handler.error_rate = error_rate
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq transcription endpoint.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args(argv)
+
+    server = serve(args.host, args.port, args.latency, args.rate_limit_rate, args.error_rate)
+    print(f"Mock Groq listening on http://{args.host}:{args.port}{ENDPOINT} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
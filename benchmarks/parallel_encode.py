@@ -0,0 +1,95 @@
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+
+from benchmarks import common
+from benchmarks.pipeline import _repeat
+
+FPS = 30
+# a keyframe every 2s so short synthetic clips still have somewhere to split
+GOP = 2 * FPS
+
+
+def stream_durations(path):
+    # {'video': seconds, 'audio': seconds} of the encoded result
+    from services import ffmpeg
+
+    command = [ffmpeg.FFPROBE_BIN, '-v', 'error', '-show_entries', 'stream=codec_type,duration', '-print_format', 'json', path]
+    out = subprocess.run(command, check=True, capture_output=True).stdout
+    return {s['codec_type']: float(s['duration']) for s in json.loads(out).get('streams', []) if s.get('duration')}
+
+
+# runs in a spawned process, see common.measure
+def stage_segments(video_path, watermark_path, frames, segments, preset):
+    from services.video import VideoProcessor
+
+    success, error = VideoProcessor(watermark_path, engine='ffmpeg', preset=preset, segments=segments).apply_watermark(video_path)
+    if not success:
+        raise Exception(error)
+    durations = stream_durations(video_path)
+    return {'frames': frames, 'video_duration': durations.get('video'), 'audio_duration': durations.get('audio')}
+
+
+def run_suite(resolution, duration, workers, preset, repeats, log=print):
+    source = common.synthetic_video(resolution, duration, FPS, gop=GOP)
+    watermark = common.synthetic_watermark()
+    target = common.work_path(f"run_parallel_{resolution}_{duration}s.mp4")
+    fresh_copy = lambda: shutil.copyfile(source, target)
+
+    results = []
+    for count in workers:
+        name = f"segments_{count}/{resolution}_{duration}s"
+        log(f"running {name}...")
+        results.append(_repeat(name, repeats, stage_segments, target, watermark, FPS * duration, count, preset, before=fresh_copy))
+    return results
+
+
+def check(results, frame_time):
+    # every run must keep the duration and a/v alignment of the single-process encode (within one frame)
+    base = next((r for r in results if 'error' not in r), None)
+    problems = []
+    if base is None:
+        return problems
+    for r in results:
+        if 'error' in r:
+            continue
+        for key in ('video_duration', 'audio_duration'):
+            if r.get(key) is not None and base.get(key) is not None and abs(r[key] - base[key]) > frame_time:
+                problems.append(f"{r['name']}: {key} {r[key]:.3f}s vs {base[key]:.3f}s")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Speedup of the keyframe-split watermark encode against the number of workers.")
+    parser.add_argument('-o', '--output', default='bench_parallel.json', help="results file (default: %(default)s)")
+    parser.add_argument('--resolution', default='1080p', choices=list(common.RESOLUTIONS))
+    parser.add_argument('--duration', type=int, default=60, help="seconds")
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--preset', default='medium')
+    parser.add_argument('-r', '--repeats', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    workers = sorted(set([1, *args.workers]))
+    results = run_suite(args.resolution, args.duration, workers, args.preset, max(1, args.repeats))
+    common.save_results(args.output, results)
+    print()
+    common.print_table(results)
+
+    base = results[0]
+    if 'error' not in base:
+        print(f"\n{'workers':>8} {'speedup':>10} {'video (s)':>10} {'audio (s)':>10}")
+        for count, r in zip(workers, results):
+            if 'error' in r: continue
+            print(f"{count:>8} {base['wall_time'] / r['wall_time']:>9.2f}x {r.get('video_duration') or 0:>10.3f} {r.get('audio_duration') or 0:>10.3f}")
+    print(f"\nResults saved to '{args.output}'")
+
+    problems = check(results, 1.0 / FPS)
+    for problem in problems:
+        print(f"Duration mismatch: {problem}")
+    return 1 if problems or any('error' in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import sys
+import shutil
+import argparse
+import statistics
+
+from benchmarks import common
+
+DEFAULT_RESOLUTIONS = ['720p', '1080p']
+DEFAULT_DURATIONS = [5, 30]
+DEFAULT_SEGMENTS = [1000, 10000, 100000]
+FPS = 30
+
+
+# stages run in a spawned process, so they have to live at module level
+def stage_watermark(engine, video_path, watermark_path, frames):
+    from services.video import VideoProcessor
+
+    success, error = VideoProcessor(watermark_path, engine=engine).apply_watermark(video_path)
+    if not success:
+        raise Exception(error)
+    return {'frames': frames}
+
+
+def stage_extract_audio(video_path, audio_path):
+    from services.audio import AudioProcessor
+
+    AudioProcessor.extract_audio(video_path, audio_path)
+
+
+def stage_save_srt(count, output_path):
+    from services.audio import SRTConverter
+
+    segments = common.synthetic_segments(count)
+    SRTConverter.save_srt(segments, output_path)
+
+
+def _repeat(name, repeats, func, *args, before=None):
+    runs = []
+    for _ in range(repeats):
+        if before:
+            before()
+        runs.append(common.measure(func, *args))
+
+    errors = [r for r in runs if 'error' in r]
+    if errors:
+        return {'name': name, 'error': errors[0]['error']}
+
+    # median of each metric, the first run usually pays for cold caches
+    result = {'name': name}
+    for key in runs[0]:
+        values = [r[key] for r in runs if r.get(key) is not None]
+        if values:
+            result[key] = round(statistics.median(values), 4)
+    return result
+
+
+def run_suite(resolutions, durations, segment_counts, engines, repeats, log=print):
+    results = []
+    watermark = common.synthetic_watermark()
+
+    for resolution in resolutions:
+        for duration in durations:
+            source = common.synthetic_video(resolution, duration, FPS)
+            case = f"{resolution}_{duration}s"
+            frames = FPS * duration
+
+            # watermarking replaces the file in place, so work on a fresh copy every run
+            target = common.work_path(f"run_{case}.mp4")
+            fresh_copy = lambda: shutil.copyfile(source, target)
+            for engine in engines:
+                name = f"watermark_{engine}/{case}"
+                log(f"running {name}...")
+                results.append(_repeat(name, repeats, stage_watermark, engine, target, watermark, frames, before=fresh_copy))
+
+            name = f"extract_audio/{case}"
+            log(f"running {name}...")
+            audio = common.work_path(f"run_{case}.mp3")
+            results.append(_repeat(name, repeats, stage_extract_audio, source, audio))
+
+    for count in segment_counts:
+        name = f"save_srt/{count}_segments"
+        log(f"running {name}...")
+        results.append(_repeat(name, repeats, stage_save_srt, count, common.work_path("run.srt")))
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the watermark, audio extraction and SRT stages.")
+    parser.add_argument('-o', '--output', default='bench_results.json', help="results file (default: %(default)s)")
+    parser.add_argument('--resolutions', nargs='+', default=DEFAULT_RESOLUTIONS, choices=list(common.RESOLUTIONS))
+    parser.add_argument('--durations', nargs='+', type=int, default=DEFAULT_DURATIONS, help="seconds")
+    parser.add_argument('--segments', nargs='+', type=int, default=DEFAULT_SEGMENTS, help="segment counts for save_srt")
+    parser.add_argument('--engines', nargs='+', default=['moviepy', 'ffmpeg'])
+    parser.add_argument('-r', '--repeats', type=int, default=3)
+    parser.add_argument('--compare', metavar='BASELINE', help="flag regressions against a stored results file")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="allowed relative slowdown (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.resolutions, args.durations, args.segments, args.engines, max(1, args.repeats))
+    common.save_results(args.output, results)
+    print()
+    common.print_table(results)
+    print(f"\nResults saved to '{args.output}'")
+
+    if not args.compare:
+        return 0
+
+    regressions = common.compare(results, common.load_results(args.compare), args.tolerance)
+    if not regressions:
+        print(f"No regressions against '{args.compare}'.")
+        return 0
+    print(f"\n{len(regressions)} regression(s) against '{args.compare}':")
+    for name, metric, old, new, change in regressions:
+        print(f"  {name}: {metric} {old} -> {new} ({change:+.1%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
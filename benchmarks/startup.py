@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from benchmarks import common
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# none of these should be imported before the window is up, they load on first use or in the prewarm
+HEAVY_MODULES = ('numpy', 'PIL', 'moviepy', 'yt_dlp', 'groq', 'httpx')
+
+# runs in a fresh interpreter: same imports as main.py, then the window is built and drawn once
+PROBE = r"""
+import sys, json, time
+start = time.perf_counter()
+from config import WATERMARK_FILENAME
+from services.video import VideoProcessor
+from UI.interface import UnifiedApp
+result = {'imports': time.perf_counter() - start}
+try:
+    app = UnifiedApp(VideoProcessor(WATERMARK_FILENAME))
+    app.update()
+    result['window'] = time.perf_counter() - start
+    app.jobs.shutdown(wait=False)
+    app.destroy()
+except Exception as e:
+    # no display (ci, ssh): only the imports can be timed
+    result['window_error'] = str(e)
+result['heavy'] = sorted({name.split('.')[0] for name in sys.modules} & set(sys.argv[1:]))
+print(json.dumps(result))
+"""
+
+
+def probe_once():
+    # own cwd so the job journal and logs of a real session are never touched
+    with tempfile.TemporaryDirectory() as cwd:
+        env = {**os.environ, 'PYTHONPATH': ROOT + os.pathsep + os.environ.get('PYTHONPATH', '')}
+        out = subprocess.run([sys.executable, '-c', PROBE, *HEAVY_MODULES], cwd=cwd, env=env,
+                             capture_output=True, text=True)
+    if out.returncode != 0:
+        lines = out.stderr.strip().splitlines()
+        raise Exception(lines[-1] if lines else f"exit code {out.returncode}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_suite(repeats):
+    runs = [probe_once() for _ in range(repeats)]
+    results = [{'name': 'startup:imports', 'wall_time': round(statistics.median(r['imports'] for r in runs), 4)}]
+    if all('window' in r for r in runs):
+        results.append({'name': 'startup:time_to_window', 'wall_time': round(statistics.median(r['window'] for r in runs), 4)})
+    else:
+        print(f"Window not timed: {runs[0].get('window_error')}")
+    heavy = sorted(set().union(*(r['heavy'] for r in runs)))
+    return results, heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the app startup (imports and time-to-window) in fresh interpreters.")
+    parser.add_argument('-o', '--output', default='bench_startup.json', help="results file (default: %(default)s)")
+    parser.add_argument('-r', '--repeats', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None, help="fail if startup takes longer than this")
+    parser.add_argument('--compare', metavar='BASELINE', help="flag regressions against a stored results file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slowdown (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results, heavy = run_suite(max(1, args.repeats))
+    common.save_results(args.output, results)
+    common.print_table(results)
+    print(f"\nResults saved to '{args.output}'")
+
+    failed = False
+    if heavy:
+        print(f"Heavy modules imported before the window was up: {', '.join(heavy)}")
+        failed = True
+    if args.max_seconds is not None:
+        slowest = results[-1]
+        if slowest['wall_time'] > args.max_seconds:
+            print(f"{slowest['name']} took {slowest['wall_time']:.3f}s, limit is {args.max_seconds:.3f}s")
+            failed = True
+    if args.compare:
+        regressions = common.compare(results, common.load_results(args.compare), args.tolerance)
+        for name, metric, old, new, change in regressions:
+            print(f"  {name}: {metric} {old} -> {new} ({change:+.1%})")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
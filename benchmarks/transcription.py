@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import argparse
+
+from benchmarks import common
+from benchmarks.pipeline import _repeat
+
+
+# runs in a spawned process, see common.measure
+def stage_transcribe(audio_path, backend_name, model_size, threads):
+    from services import ffmpeg
+    from services.transcription import get_backend
+
+    backend = get_backend(backend_name, api_key=os.getenv("GROQ_API_KEY", ""), model_size=model_size, threads=threads)
+    load_time = 0.0
+    if backend_name == 'local':
+        # model load is a one-off per process, kept out of the real-time factor
+        start = time.perf_counter()
+        backend._model()
+        load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    segments = backend.transcribe_audio(audio_path)
+    elapsed = time.perf_counter() - start
+    duration = ffmpeg.duration(audio_path)
+    # rtf < 1 is faster than real time
+    return {'transcribe_time': round(elapsed, 4), 'load_time': round(load_time, 4), 'audio_seconds': round(duration, 3),
+            'rtf': round(elapsed / duration, 4), 'segments': len(segments)}
+
+
+def run_suite(audio_path, backends, models, threads, repeats, log=print):
+    results = []
+    for backend in backends:
+        for model in (models if backend == 'local' else [None]):
+            for count in (threads if backend == 'local' else [None]):
+                name = f"{backend}" + (f"_{model}_t{count}" if backend == 'local' else "")
+                log(f"running {name}...")
+                results.append(_repeat(name, repeats, stage_transcribe, audio_path, backend, model, count))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Real-time factor of each transcription backend on the same audio.")
+    parser.add_argument('audio', help="speech recording to transcribe (any format ffmpeg reads)")
+    parser.add_argument('-o', '--output', default='bench_transcription.json', help="results file (default: %(default)s)")
+    parser.add_argument('--backends', nargs='+', choices=('groq', 'local'), default=['groq', 'local'])
+    parser.add_argument('--models', nargs='+', default=['small'], help="local model sizes")
+    parser.add_argument('--threads', nargs='+', type=int, default=[os.cpu_count() or 1], help="local cpu thread counts")
+    parser.add_argument('-r', '--repeats', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.audio):
+        print(f"'{args.audio}' not found.")
+        return 2
+    if 'groq' in args.backends and not os.getenv("GROQ_API_KEY"):
+        # GROQ_BASE_URL=http://127.0.0.1:8765 with benchmarks.mock_groq measures the client without the network
+        print("Skipping groq: GROQ_API_KEY is not set.")
+        args.backends = [b for b in args.backends if b != 'groq']
+        if not args.backends:
+            return 2
+
+    results = run_suite(args.audio, args.backends, args.models, args.threads, max(1, args.repeats))
+    common.save_results(args.output, results)
+    print()
+    print(f"{'backend':<30} {'rtf':>8} {'speed':>8} {'load (s)':>10} {'rss (MB)':>10} {'segments':>9}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['name']:<30} ERROR: {r['error']}")
+            continue
+        rss = f"{r['peak_rss_mb']:.1f}" if r.get('peak_rss_mb') else '-'
+        print(f"{r['name']:<30} {r['rtf']:>8.3f} {1 / r['rtf']:>7.1f}x {r['load_time']:>10.2f} {rss:>10} {int(r['segments']):>9}")
+    print(f"\nResults saved to '{args.output}'")
+    return 1 if any('error' in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,21 @@
 import os
-import PIL.Image
 from dotenv import load_dotenv
 
 def setup_config():
     # load .env
     load_dotenv()
 
-    # fix for newer pillow versions bc why not
-    if not hasattr(PIL.Image, 'ANTIALIAS'):
-        PIL.Image.ANTIALIAS = PIL.Image.LANCZOS # type: ignore
-
 WATERMARK_FILENAME = "watermark.png"
+# import numpy/moviepy/yt-dlp/groq in the background once the window is up, so the first job doesn't wait for them
+PREWARM_BACKENDS = True
+# per-stage timings to .cache/trace.jsonl and .cache/metrics.prom (see services/telemetry.py)
+TELEMETRY = False
+# subtitles: 'groq' uploads the audio, 'local' runs whisper on this machine (pip install faster-whisper)
+TRANSCRIPTION_BACKEND = 'groq'
+# local backend: model size (tiny, base, small, medium, large-v3...), cpu threads (None = all cores), weight precision
+WHISPER_MODEL = 'small'
+WHISPER_THREADS = None
+WHISPER_COMPUTE_TYPE = 'int8'
 
 # run everything when imported
 setup_config()
\ No newline at end of file
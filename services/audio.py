@@ -1,55 +1,310 @@
 import os
+import re
+import json
 import math
+import time
+import tempfile
 import subprocess
-from groq import Groq
+from concurrent.futures import ThreadPoolExecutor
+from services import ffmpeg, telemetry
+from services.groq_client import get_client
+
+class AudioTooLargeError(Exception):
+    pass
 
 class SRTConverter:
     @staticmethod
-    def format_timestamp(seconds: float) -> str:
+    def format_timestamp(seconds: float, separator: str = ",") -> str:
         if seconds < 0: seconds = 0
         frac, whole = math.modf(seconds)
-        return f"{int(whole // 3600):02d}:{int((whole % 3600) // 60):02d}:{int(whole % 60):02d},{int(frac * 1000):03d}"
+        return f"{int(whole // 3600):02d}:{int((whole % 3600) // 60):02d}:{int(whole % 60):02d}{separator}{int(frac * 1000):03d}"
 
     @staticmethod
     def save_srt(segments, output_path: str):
+        with SubtitleWriter({'srt': output_path}) as writer:
+            writer.write_all(segments)
+
+class SubtitleWriter:
+    # writes srt / vtt / json sidecar in one pass over the segments, in big buffered blocks.
+    # flushes every flush_interval seconds so streamed results show up on disk while they arrive
+    FORMATS = ('srt', 'vtt', 'json')
+
+    def __init__(self, outputs, buffer_size: int = 256 * 1024, flush_interval: float = 0.5):
+        # outputs: {format: path}
+        unknown = set(outputs) - set(self.FORMATS)
+        if unknown: raise ValueError(f"Unknown subtitle format(s): {', '.join(sorted(unknown))}")
+        self.outputs = dict(outputs)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._files = {}
+        self._buffers = {fmt: [] for fmt in self.outputs}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        try:
+            for fmt, path in self.outputs.items():
+                self._files[fmt] = open(path, "w", encoding="utf-8")
+        except IOError as e:
+            self._close_files()
+            raise Exception(f"Error saving subtitle file: {e}")
+
+        if 'vtt' in self._buffers: self._buffers['vtt'].append("WEBVTT\n\n")
+        if 'json' in self._buffers: self._buffers['json'].append("[")
+
+    @staticmethod
+    def outputs_for(base_path: str, formats=('srt',)):
+        base = os.path.splitext(base_path)[0]
+        return {fmt: f"{base}.{fmt}" for fmt in formats}
+
+    def write(self, entry):
+        start = entry.get('start', 0)
+        end = entry.get('end', 0)
+        text = entry.get('text', '').strip()
+        self.count += 1
+
+        for fmt, buffer in self._buffers.items():
+            if fmt == 'srt':
+                chunk = f"{self.count}\n{SRTConverter.format_timestamp(start)} --> {SRTConverter.format_timestamp(end)}\n{text}\n\n"
+            elif fmt == 'vtt':
+                chunk = f"{SRTConverter.format_timestamp(start, '.')} --> {SRTConverter.format_timestamp(end, '.')}\n{text}\n\n"
+            else:
+                item = json.dumps({'id': self.count - 1, 'start': start, 'end': end, 'text': text}, ensure_ascii=False)
+                chunk = ("\n  " if self.count == 1 else ",\n  ") + item
+            buffer.append(chunk)
+            self._buffered += len(chunk)
+
+        if self._buffered >= self.buffer_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def write_all(self, segments):
+        for entry in segments:
+            self.write(entry)
+        return self.count
+
+    def flush(self):
         try:
-            with open(output_path, "w", encoding="utf-8") as f:
-                for i, entry in enumerate(segments):
-                    start = entry.get('start', 0)
-                    end = entry.get('end', 0)
-                    text = entry.get('text', '').strip()
-                    f.write(f"{i + 1}\n")
-                    f.write(f"{SRTConverter.format_timestamp(start)} --> {SRTConverter.format_timestamp(end)}\n")
-                    f.write(f"{text}\n\n")
+            for fmt, buffer in self._buffers.items():
+                if buffer:
+                    self._files[fmt].write("".join(buffer))
+                    buffer.clear()
+                self._files[fmt].flush()
         except IOError as e:
-            raise Exception(f"Error saving SRT file: {e}")
+            raise Exception(f"Error saving subtitle file: {e}")
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if not self._files: return
+        if 'json' in self._buffers: self._buffers['json'].append("\n]\n" if self.count else "]\n")
+        try:
+            self.flush()
+        finally:
+            self._close_files()
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 class AudioProcessor:
     @staticmethod
     def extract_audio(video_path: str, audio_output_path: str):
-        # !!!!! FFMPEG MUST BE IN PATH !!!!!!!!!
-        command = ['ffmpeg', '-y', '-i', video_path, '-vn', '-ac', '1', '-ar', '16000', '-ab', '32k', '-f', 'mp3', audio_output_path]
-        startupinfo = None
-        if os.name == 'nt':
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        args = ['-i', video_path, '-vn', '-ac', '1', '-ar', '16000', '-ab', '32k', '-f', 'mp3', audio_output_path]
         try:
-            subprocess.run(command, check=True, startupinfo=startupinfo, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            with telemetry.span('audio.extract', output='file'):
+                ffmpeg.run(args, check=True)
         except (subprocess.CalledProcessError, FileNotFoundError):
             raise Exception("Error extracting audio. Check if FFmpeg is installed and in PATH.")
 
+    @staticmethod
+    def extract_audio_bytes(video_path: str, max_bytes: int = None, block_size: int = 64 * 1024, spill_path: str = None) -> bytes:
+        # same audio as extract_audio, read from ffmpeg's stdout so nothing touches the disk.
+        # with spill_path, audio over max_bytes carries on into that file and None is returned
+        # instead of AudioTooLargeError: the same ffmpeg run is drained, nothing is extracted twice
+        args = ['-i', video_path, '-vn', '-ac', '1', '-ar', '16000', '-ab', '32k', '-f', 'mp3', 'pipe:1']
+        try:
+            process = ffmpeg.popen(args, stdout=subprocess.PIPE)
+        except FileNotFoundError:
+            raise Exception("Error extracting audio. Check if FFmpeg is installed and in PATH.")
+
+        buffer = bytearray()
+        spill = None
+        size = 0
+        try:
+            with telemetry.span('audio.extract', output='pipe') as span:
+                for block in iter(lambda: process.stdout.read(block_size), b""):
+                    size += len(block)
+                    if spill is not None:
+                        spill.write(block)
+                        continue
+                    buffer += block
+                    if max_bytes is not None and size > max_bytes:
+                        if spill_path is None:
+                            raise AudioTooLargeError(f"Extracted audio is bigger than {max_bytes} bytes.")
+                        spill = open(spill_path, 'wb')
+                        spill.write(buffer)
+                        buffer = bytearray()
+                span.set(bytes=size, output='file' if spill is not None else 'pipe')
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            if spill is not None: spill.close()
+            process.stdout.close()
+            process.wait()
+
+        if process.returncode != 0:
+            raise Exception("Error extracting audio. Check if FFmpeg is installed and in PATH.")
+        return None if spill is not None else bytes(buffer)
+
+    @staticmethod
+    def detect_silences(audio_path: str, noise_db: int = -35, min_silence: float = 0.4):
+        args = ['-i', audio_path, '-af', f"silencedetect=n={noise_db}dB:d={min_silence}", '-f', 'null', '-']
+        try:
+            result = ffmpeg.run(args, check=True, stderr=subprocess.PIPE)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            raise Exception("Error detecting silences. Check if FFmpeg is installed and in PATH.")
+
+        log = result.stderr.decode(errors='ignore')
+        starts = [float(v) for v in re.findall(r"silence_start: (-?[\d.]+)", log)]
+        ends = [float(v) for v in re.findall(r"silence_end: (-?[\d.]+)", log)]
+        return list(zip(starts, ends))
+
+    @staticmethod
+    def plan_chunks(duration: float, silences, max_seconds: float, overlap: float = 1.0):
+        # cut in the middle of the last silence that keeps the chunk under max_seconds;
+        # if there is none, hard cut and let the next chunk overlap so no word is lost
+        if max_seconds <= 0: raise ValueError("max_seconds must be positive.")
+        # each hard cut has to move forward
+        overlap = min(overlap, max_seconds / 2)
+        chunks = []
+        start = 0.0
+        while duration - start > max_seconds:
+            limit = start + max_seconds
+            cuts = [(s + e) / 2 for s, e in silences if start + max_seconds / 2 < (s + e) / 2 <= limit]
+            if cuts:
+                chunks.append((start, cuts[-1]))
+                start = cuts[-1]
+            else:
+                chunks.append((start, limit))
+                start = limit - overlap
+        chunks.append((start, duration))
+        return chunks
+
+    @staticmethod
+    def split_audio(audio_path: str, chunks, output_dir: str):
+        paths = []
+        for i, (start, end) in enumerate(chunks):
+            path = os.path.join(output_dir, f"chunk_{i:03d}.mp3")
+            args = ['-ss', f"{start:.3f}", '-t', f"{end - start:.3f}", '-i', audio_path, '-c', 'copy', path]
+            try:
+                ffmpeg.run(args, check=True)
+            except (subprocess.CalledProcessError, FileNotFoundError):
+                raise Exception("Error splitting audio. Check if FFmpeg is installed and in PATH.")
+            paths.append(path)
+        return paths
+
+def _words(text):
+    return [w.strip(".,!?;:\"'").lower() for w in text.split()]
+
+def iter_merge_segments(chunk_results):
+    # chunk_results: (offset, segments) in chunk order; timestamps come back relative to each chunk.
+    # only the last kept segment is remembered, so this streams in constant memory
+    last = last_chunk = None
+    count = 0
+    for chunk, (offset, segments) in enumerate(chunk_results):
+        for segment in segments:
+            entry = dict(segment)
+            entry['start'] = entry.get('start', 0) + offset
+            entry['end'] = entry.get('end', 0) + offset
+            text = entry.get('text', '')
+
+            # only seams overlap: inside one transcription, zero-length or touching segments are kept as they are
+            if last is not None and last_chunk != chunk:
+                # fully inside the overlap already covered by the previous chunk
+                if entry['end'] <= last['end'] + 0.05:
+                    continue
+                # a segment starting exactly where the last one ended can still repeat its words
+                if entry['start'] <= last['end']:
+                    # drop the words both chunks heard at the seam
+                    prev, cur = _words(last.get('text', '')), _words(text)
+                    repeated = next((k for k in range(min(len(prev), len(cur)), 0, -1) if prev[-k:] == cur[:k]), 0)
+                    text = " " + " ".join(text.split()[repeated:])
+                    entry['start'] = last['end']
+                    if not text.strip():
+                        continue
+
+            entry['text'] = text
+            entry['id'] = count
+            count += 1
+            last = entry
+            last_chunk = chunk
+            yield entry
+
+def merge_segments(chunk_results):
+    return list(iter_merge_segments(chunk_results))
+
 class GroqService:
+    MODEL = "whisper-large-v3"
+    LANGUAGE = "en"
+    # the api rejects uploads bigger than 25MB, keep some room for the multipart overhead
+    MAX_UPLOAD_BYTES = 24 * 1024 * 1024
+
     @staticmethod
-    def transcribe(api_key: str, audio_path: str):
+    def transcribe(api_key: str, audio_path: str, base_url: str = None, client=None):
         if not api_key: raise ValueError("Groq API Key was not provided.")
-        client = Groq(api_key=api_key)
+        client = client or get_client(api_key, base_url)
         if not os.path.exists(audio_path): raise FileNotFoundError("Audio file not found.")
         
         with open(audio_path, "rb") as file:
-            transcription = client.audio.transcriptions.create(
-                file=(os.path.basename(audio_path), file.read()),
-                model="whisper-large-v3",
-                response_format="verbose_json",
-                language="en" 
-            )
-        return transcription
\ No newline at end of file
+            return GroqService.transcribe_bytes(api_key, file.read(), os.path.basename(audio_path), client=client)
+
+    @staticmethod
+    def transcribe_bytes(api_key: str, data: bytes, filename: str = "audio.mp3", base_url: str = None, client=None):
+        if not api_key: raise ValueError("Groq API Key was not provided.")
+        # pooled client: keep-alive connections, rate limit pacing and retries on 429/5xx
+        client = client or get_client(api_key, base_url)
+        return client.transcribe(filename, data, GroqService.MODEL, GroqService.LANGUAGE)
+
+    @staticmethod
+    def stats(api_key: str, base_url: str = None):
+        # latency percentiles, retries and failures of the pooled client
+        return get_client(api_key, base_url).stats.snapshot()
+
+    @staticmethod
+    def transcribe_chunked(api_key: str, audio_path: str, max_bytes: int = MAX_UPLOAD_BYTES, workers: int = 4, base_url: str = None):
+        # returns the merged segment list (same dicts save_srt takes)
+        return list(GroqService.iter_transcribe_chunked(api_key, audio_path, max_bytes, workers, base_url))
+
+    @staticmethod
+    def iter_transcribe_chunked(api_key: str, audio_path: str, max_bytes: int = MAX_UPLOAD_BYTES, workers: int = 4, base_url: str = None):
+        # yields merged segments in order as soon as each chunk (and the ones before it) is done
+        if not api_key: raise ValueError("Groq API Key was not provided.")
+        if not os.path.exists(audio_path): raise FileNotFoundError("Audio file not found.")
+        client = get_client(api_key, base_url)
+
+        size = os.path.getsize(audio_path)
+        if size <= max_bytes:
+            yield from iter_merge_segments([(0.0, segments_of(GroqService.transcribe(api_key, audio_path, client=client)))])
+            return
+
+        duration = ffmpeg.duration(audio_path)
+        max_seconds = duration * max_bytes / size
+        chunks = AudioProcessor.plan_chunks(duration, AudioProcessor.detect_silences(audio_path), max_seconds)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = AudioProcessor.split_audio(audio_path, chunks, tmp)
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                results = pool.map(lambda path: segments_of(GroqService.transcribe(api_key, path, client=client)), paths)
+                yield from iter_merge_segments((start, segments) for (start, _), segments in zip(chunks, results))
+
+def segments_of(transcription):
+    # verbose_json segments as plain dicts
+    segments = getattr(transcription, 'segments', None) or []
+    return [s if isinstance(s, dict) else s.model_dump() for s in segments]
\ No newline at end of file
@@ -0,0 +1,34 @@
+import time
+import importlib
+import threading
+
+# the module behind each tab whose load_backends() does the heavy imports
+BACKENDS = {
+    'watermark': 'services.video',
+    'subtitle': 'services.groq_client',
+    'hunt': 'services.youtube',
+}
+
+
+def load(kind):
+    # returns how long the imports took (~0 when they were already loaded)
+    start = time.perf_counter()
+    importlib.import_module(BACKENDS[kind]).load_backends()
+    return time.perf_counter() - start
+
+
+def prewarm(kinds=None, on_done=None):
+    # imports in a daemon thread; a missing optional backend only matters when its tab is used
+    def run():
+        timings = {}
+        for kind in kinds or BACKENDS:
+            try:
+                timings[kind] = round(load(kind), 3)
+            except Exception as e:
+                timings[kind] = f"failed: {e}"
+        if on_done:
+            on_done(timings)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
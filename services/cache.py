@@ -0,0 +1,115 @@
+import os
+import json
+import hashlib
+import threading
+
+CACHE_DIR = os.path.join(".cache", "transcriptions")
+# raw segments are small, this holds thousands of videos
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+# anything that changes the extracted audio must be part of the key
+EXTRACTION_PARAMS = "mp3:ac=1:ar=16000:ab=32k"
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, "index.json")
+        self._index = None
+
+    def _load_index(self):
+        # path+size+mtime -> content hash, so unchanged videos are not re-hashed on every lookup
+        if self._index is None:
+            try:
+                with open(self._index_path, encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def video_hash(self, video_path):
+        stat = os.stat(video_path)
+        fingerprint = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        with self._lock:
+            cached = self._load_index().get(fingerprint)
+        if cached:
+            return cached
+
+        digest = file_digest(video_path)
+        with self._lock:
+            index = self._load_index()
+            index[fingerprint] = digest
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self._index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp, self._index_path)
+        return digest
+
+    def key(self, video_path, model, language):
+        return self.key_for_hash(self.video_hash(video_path), model, language)
+
+    @staticmethod
+    def key_for_hash(content_hash, model, language):
+        # for content that is gone (a source replaced in place), from a file_digest taken earlier
+        raw = f"{content_hash}|{EXTRACTION_PARAMS}|{model}|{language}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                segments = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # touch it so eviction sees it as recently used
+        os.utime(path, None)
+        self.hits += 1
+        return segments
+
+    def put(self, key, segments):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(segments, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json") or name == "index.json":
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            # least recently used first
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    total -= size
+                except OSError:
+                    pass
@@ -0,0 +1,107 @@
+import os
+import json
+import threading
+import subprocess
+
+# !!!!! FFMPEG MUST BE IN PATH !!!!!!!!!
+FFMPEG_BIN = 'ffmpeg'
+FFPROBE_BIN = 'ffprobe'
+# audio codecs mp4 can hold without re-encoding
+MP4_AUDIO_CODECS = ('aac', 'mp3', 'ac3', 'eac3', 'alac', 'opus', 'flac')
+
+
+def startupinfo():
+    # hides the console window ffmpeg would open on windows
+    if os.name != 'nt':
+        return None
+    info = subprocess.STARTUPINFO()
+    info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return info
+
+
+def run(args, **kwargs):
+    kwargs.setdefault('stdout', subprocess.DEVNULL)
+    kwargs.setdefault('stderr', subprocess.DEVNULL)
+    return subprocess.run([FFMPEG_BIN, '-y', *args], startupinfo=startupinfo(), **kwargs)
+
+
+def popen(args, **kwargs):
+    kwargs.setdefault('stdin', subprocess.DEVNULL)
+    kwargs.setdefault('stderr', subprocess.DEVNULL)
+    return subprocess.Popen([FFMPEG_BIN, '-y', *args], startupinfo=startupinfo(), **kwargs)
+
+
+def popen_progress(args, callback, **kwargs):
+    # ffmpeg writes key=value blocks (frame, fps, out_time...) to stdout, each one ending with progress=...
+    process = popen(['-progress', 'pipe:1', '-nostats', *args], stdout=subprocess.PIPE, **kwargs)
+
+    def read():
+        block = {}
+        for line in process.stdout:
+            key, _, value = line.decode(errors='ignore').strip().partition('=')
+            block[key] = value
+            if key == 'progress':
+                try:
+                    callback(block)
+                except Exception:
+                    pass
+                block = {}
+        process.stdout.close()
+
+    threading.Thread(target=read, daemon=True).start()
+    return process
+
+
+def probe(path):
+    command = [FFPROBE_BIN, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path]
+    try:
+        out = subprocess.run(command, check=True, capture_output=True, startupinfo=startupinfo()).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        raise Exception(f"Could not read '{path}'. Check if FFmpeg (ffprobe) is installed and in PATH.")
+
+    info = json.loads(out or b'{}')
+    streams = info.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    if video is None:
+        raise Exception(f"'{path}' has no video stream.")
+
+    return {
+        'width': int(video['width']),
+        'height': int(video['height']),
+        'duration': float(info.get('format', {}).get('duration') or video.get('duration') or 0),
+        'has_audio': audio is not None,
+        'audio_codec': audio.get('codec_name') if audio else None,
+    }
+
+
+def mp4_audio_codec(info):
+    # -c:a for an mp4 output, picked from probe(): copy what mp4 can hold, re-encode the rest to aac
+    return 'copy' if info['audio_codec'] in MP4_AUDIO_CODECS else 'aac'
+
+
+def keyframes(path):
+    # keyframe timestamps of the first video stream, relative to the start of the file.
+    # reads packet flags only, nothing is decoded
+    command = [FFPROBE_BIN, '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags:format=start_time',
+               '-print_format', 'json', path]
+    try:
+        out = subprocess.run(command, check=True, capture_output=True, startupinfo=startupinfo()).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        raise Exception(f"Could not read '{path}'. Check if FFmpeg (ffprobe) is installed and in PATH.")
+
+    info = json.loads(out or b'{}')
+    start = float(info.get('format', {}).get('start_time') or 0)
+    times = {round(float(p['pts_time']) - start, 6) for p in info.get('packets', [])
+             if 'K' in p.get('flags', '') and p.get('pts_time') not in (None, 'N/A')}
+    return sorted(times)
+
+
+def duration(path):
+    # works for audio-only files too, unlike probe()
+    command = [FFPROBE_BIN, '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=nw=1:nk=1', path]
+    try:
+        out = subprocess.run(command, check=True, capture_output=True, startupinfo=startupinfo()).stdout
+        return float(out.strip())
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+        raise Exception(f"Could not read '{path}'. Check if FFmpeg (ffprobe) is installed and in PATH.")
@@ -0,0 +1,204 @@
+import re
+import time
+import random
+import threading
+from collections import deque
+from services import telemetry
+
+# statuses worth another try; anything else (400, 401, 413...) will fail the same way again
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def parse_duration(value):
+    # groq sends resets like "2m59.56s", "7.66s" or "120ms"; retry-after is plain seconds
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}[unit]
+    return total if matched else None
+
+
+class RateLimitScheduler:
+    # spaces requests out using the x-ratelimit-* headers instead of waiting for 429s
+    def __init__(self, min_interval=0.25):
+        self._lock = threading.Lock()
+        self._next_allowed = 0.0
+        # gap each request reserves behind it, from the last headers seen
+        self._interval = 0.0
+        # used when a window is empty and there's no spacing known yet
+        self.min_interval = min_interval
+
+    def wait(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._next_allowed - now
+                if delay <= 0:
+                    # take the slot: concurrent callers queue up one interval apart instead of all
+                    # going out the moment the window opens
+                    self._next_allowed = max(self._next_allowed, now) + self._interval
+                    return
+            time.sleep(min(delay, 1.0))
+
+    def _delay_until(self, seconds, interval=None):
+        with self._lock:
+            self._next_allowed = max(self._next_allowed, time.monotonic() + seconds)
+            if interval is not None:
+                self._interval = interval
+
+    def update(self, headers):
+        retry_after = parse_duration(headers.get('retry-after'))
+        if retry_after:
+            self._delay_until(retry_after, self._interval or self.min_interval)
+            return
+
+        delay = interval = None
+        for kind in ('requests', 'tokens'):
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+            reset = parse_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+            if remaining is None or reset is None:
+                continue
+            try:
+                remaining = int(float(remaining))
+            except ValueError:
+                continue
+            if remaining <= 0:
+                # nothing left until the reset; after it, keep the last known spacing
+                kind_delay, kind_interval = reset, self._interval or self.min_interval
+            else:
+                # spread what is left of the window evenly instead of bursting into a wall
+                kind_delay = kind_interval = reset / (remaining + 1)
+            delay = max(delay or 0.0, kind_delay)
+            interval = max(interval or 0.0, kind_interval)
+        if delay is not None:
+            self._delay_until(delay, interval)
+
+
+class ClientStats:
+    def __init__(self, keep=1000):
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=keep)
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def record(self, latency, retries, failed=False):
+        with self._lock:
+            self.latencies.append(latency)
+            self.requests += 1
+            self.retries += retries
+            if failed:
+                self.failures += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stats = {'requests': self.requests, 'retries': self.retries, 'failures': self.failures}
+        if latencies:
+            stats['latency_mean'] = round(sum(latencies) / len(latencies), 3)
+            stats['latency_p50'] = round(latencies[len(latencies) // 2], 3)
+            stats['latency_p95'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+        return stats
+
+
+def load_backends():
+    # the groq sdk and httpx are only imported by the first client (or the prewarm)
+    import httpx
+    import groq
+
+
+class GroqClient:
+    # one per api key: keeps the https connections alive and owns the retry/pacing policy
+    def __init__(self, api_key, base_url=None, max_retries=5, base_delay=1.0, max_delay=30.0,
+                 timeout=300.0, max_connections=8):
+        import httpx
+        from groq import Groq
+
+        self._http = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        # retries are ours, the sdk would retry blindly without looking at the pacing
+        self.client = Groq(api_key=api_key, base_url=base_url, http_client=self._http, max_retries=0)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.scheduler = RateLimitScheduler()
+        self.stats = ClientStats()
+
+    def _backoff(self, attempt, headers=None):
+        # full jitter, but never sooner than the server asked for
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = parse_duration((headers or {}).get('retry-after'))
+        return max(delay, retry_after or 0)
+
+    def transcribe(self, filename, data, model, language):
+        with telemetry.span('groq.transcribe', bytes=len(data)) as span:
+            response, retries = self._transcribe(filename, data, model, language)
+            span.set(attempts=retries + 1)
+            return response
+
+    def _transcribe(self, filename, data, model, language):
+        # (parsed response, retries); the spans split pacing waits from upload + api latency
+        import groq
+
+        attempt = 0
+        start = time.perf_counter()
+        while True:
+            with telemetry.span('groq.rate_limit_wait'):
+                self.scheduler.wait()
+            try:
+                with telemetry.span('groq.request', attempt=attempt):
+                    raw = self.client.audio.transcriptions.with_raw_response.create(
+                        file=(filename, data),
+                        model=model,
+                        response_format="verbose_json",
+                        language=language
+                    )
+            except groq.APIStatusError as e:
+                headers = e.response.headers
+                self.scheduler.update(headers)
+                telemetry.count('groq_errors', status=e.status_code)
+                if e.status_code not in RETRY_STATUS or attempt >= self.max_retries:
+                    self.stats.record(time.perf_counter() - start, attempt, failed=True)
+                    raise
+                with telemetry.span('groq.backoff'):
+                    time.sleep(self._backoff(attempt, headers))
+                attempt += 1
+                continue
+            except groq.APIConnectionError:
+                telemetry.count('groq_errors', status='connection')
+                if attempt >= self.max_retries:
+                    self.stats.record(time.perf_counter() - start, attempt, failed=True)
+                    raise
+                with telemetry.span('groq.backoff'):
+                    time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            self.scheduler.update(raw.headers)
+            self.stats.record(time.perf_counter() - start, attempt)
+            telemetry.count('groq_upload_bytes', len(data))
+            return raw.parse(), attempt
+
+    def close(self):
+        self._http.close()
+
+
+def get_client(api_key, base_url=None):
+    key = (api_key, base_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = GroqClient(api_key, base_url)
+        return client
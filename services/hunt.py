@@ -0,0 +1,108 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# end of a term's result stream
+_END = object()
+
+
+class AsyncHuntEngine:
+    # probes several terms at once on top of a YoutubeProspector.
+    # probes only see the channels known when the hunt started, and leads are committed
+    # term by term in input order, so the result doesn't depend on which probe finishes first
+    def __init__(self, prospector, concurrency=4, cancel_timeout=2.0, poll_interval=0.1):
+        self.prospector = prospector
+        self.concurrency = max(1, concurrency)
+        self.cancel_timeout = cancel_timeout
+        self.poll_interval = poll_interval
+
+    def run(self, terms):
+        terms = [t.strip() for t in terms if t.strip()]
+        if terms:
+            asyncio.run(self._run(terms))
+
+    async def _run(self, terms):
+        p = self.prospector
+        loop = asyncio.get_running_loop()
+        # the blocking yt-dlp calls run here; the semaphore is the global limit across all terms
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        limit = asyncio.Semaphore(self.concurrency)
+        seen = frozenset(p.seen_channels)
+
+        async def call(func, *args):
+            async with limit:
+                if p.stop_flag: return None
+                return await loop.run_in_executor(executor, func, *args)
+
+        queues = [asyncio.Queue() for _ in terms]
+        probes = [asyncio.create_task(self._probe(term, queue, call, seen)) for term, queue in zip(terms, queues)]
+        stopped = asyncio.create_task(self._wait_for_stop())
+
+        try:
+            for term, queue in zip(terms, queues):
+                p.log(f"\nProbing niche: '{term}'...")
+                while True:
+                    getter = asyncio.create_task(queue.get())
+                    await asyncio.wait({getter, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        return
+                    kind, data = getter.result()
+                    if kind == 'done':
+                        break
+                    if kind == 'log':
+                        p.log(data)
+                    elif kind == 'error':
+                        p.log(f"Error on term '{term}': {data}")
+                    elif p._accept(data, term):
+                        return
+        finally:
+            # goal reached, stopped or finished: drop everything still queued or running
+            p.stop_flag = True
+            stopped.cancel()
+            for probe in probes:
+                probe.cancel()
+            await asyncio.wait(probes, timeout=self.cancel_timeout)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _wait_for_stop(self):
+        while not self.prospector.stop_flag:
+            await asyncio.sleep(self.poll_interval)
+
+    async def _probe(self, term, queue, call, seen):
+        p = self.prospector
+        budget = p.new_budget()
+        fetches = deque()
+
+        async def resolve(fetch):
+            video = await fetch
+            # pre-check against the start snapshot; the commit re-validates against live state
+            hit = p._validate_video(video, seen)
+            budget.record(hit)
+            if hit:
+                await queue.put(('video', video))
+
+        try:
+            # YoutubeDL isn't thread safe: each probe lists through its own instance. its next() calls may land
+            # on any executor thread, but they never overlap since the probe awaits each one
+            with p.ydl_factory(p.flat_opts) as ydl:
+                # result pages stream in one entry at a time, the budget decides how deep to go
+                survivors = p._survivors(ydl, term, budget, seen)
+                while True:
+                    entry = await call(next, survivors, _END)
+                    if entry is _END or entry is None: break
+                    fetches.append(asyncio.ensure_future(call(p._fetch_details, entry)))
+                    # same fixed window as the sequential hunt, so the budget sees hits with the same lag
+                    if len(fetches) >= p.detail_workers * 2:
+                        await resolve(fetches.popleft())
+                while fetches:
+                    await resolve(fetches.popleft())
+            await queue.put(('log', f"   scanned {budget.entries} results, {budget.hits} matches"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(('error', e))
+        finally:
+            for fetch in fetches:
+                fetch.cancel()
+        await queue.put(('done', None))
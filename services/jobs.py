@@ -0,0 +1,394 @@
+import os
+import json
+import time
+import uuid
+import heapq
+import threading
+from services import telemetry
+
+JOURNAL_PATH = os.path.join(".cache", "jobs.jsonl")
+
+# an encode already uses every core, so a second one only competes with it;
+# transcriptions mostly wait on the network, hunts share one lead store
+DEFAULT_LIMITS = {
+    'watermark': 1,
+    'subtitle': 8,
+    'hunt': 1,
+}
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class QueueBusy(Exception):
+    # another process (the gui, a worker) already owns the journal
+    pass
+
+
+def _lock_exclusive(f):
+    # released when the file is closed or the process dies
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+class Job:
+    def __init__(self, kind, payload, priority=0, id=None, state=QUEUED, created=None,
+                 result=None, error=None, attempts=0, updated=None):
+        self.id = id or uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.payload = payload
+        # higher runs first
+        self.priority = priority
+        self.state = state
+        self.created = created or time.time()
+        self.updated = updated or self.created
+        self.result = result
+        self.error = error
+        self.attempts = attempts
+        self.progress = None
+        # never written to the journal (api keys...)
+        self.secrets = {}
+        self.cancel_requested = False
+        # set by handlers that can stop midway (hunt)
+        self.on_cancel = None
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'kind': self.kind, 'payload': self.payload, 'priority': self.priority,
+            'state': self.state, 'created': self.created, 'updated': self.updated,
+            'result': self.result, 'error': self.error, 'attempts': self.attempts,
+        }
+
+    def status(self):
+        return {**self.to_dict(), 'progress': self.progress}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['kind'], data['payload'], data.get('priority', 0), data['id'], data.get('state', QUEUED),
+                   data.get('created'), data.get('result'), data.get('error'), data.get('attempts', 0), data.get('updated'))
+
+
+class JobQueue:
+    # handlers: {kind: callable(job, report)} returning a json-able result; report(event, data) sends progress,
+    # report('checkpoint') writes the job (payload changes included) to the journal before going on
+    # on_event(job_status, event, data): event is 'state' (data = new state) or whatever the handler reported.
+    # only one queue per journal can run jobs (QueueBusy otherwise); read_only just loads it, e.g. for a status listing
+    def __init__(self, handlers, limits=None, journal_path=JOURNAL_PATH, on_event=None, read_only=False):
+        self.handlers = handlers
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.journal_path = journal_path
+        self.on_event = on_event
+        self._jobs = {}
+        self._heap = []
+        self._seq = 0
+        self._running = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._dispatcher = None
+        self._journal = None
+        self._owner = None
+        self.read_only = read_only
+        if journal_path and not read_only:
+            self._acquire()
+        self._resume()
+
+    def _acquire(self):
+        if os.path.dirname(self.journal_path):
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        owner = open(self.journal_path + ".lock", 'a+')
+        try:
+            _lock_exclusive(owner)
+        except OSError:
+            owner.close()
+            raise QueueBusy(f"The job queue in '{self.journal_path}' is in use by another process.")
+        self._owner = owner
+
+    # journal: one json line per state change, replayed on start so queued or interrupted jobs run again
+    def _resume(self):
+        latest = {}
+        if self.journal_path and os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        # torn last line from a crash
+                        continue
+                    latest[data['id']] = data
+
+        for data in latest.values():
+            job = Job.from_dict(data)
+            if job.state == RUNNING and not self.read_only:
+                # it was interrupted, run it again from the start
+                job.state = QUEUED
+            self._jobs[job.id] = job
+            if job.state == QUEUED:
+                self._push(job)
+
+        if self.journal_path and not self.read_only:
+            # compact: only what still matters survives the restart
+            tmp = self.journal_path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for job in self._jobs.values():
+                    if job.state not in FINISHED:
+                        f.write(json.dumps(job.to_dict()) + "\n")
+            os.replace(tmp, self.journal_path)
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _record(self, job):
+        job.updated = time.time()
+        if not self._journal:
+            return
+        self._journal.write(json.dumps(job.to_dict()) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _push(self, job):
+        self._seq += 1
+        heapq.heappush(self._heap, (-job.priority, self._seq, job.id))
+
+    def _emit(self, job, event, data):
+        if self.on_event:
+            try:
+                self.on_event(job.status(), event, data)
+            except Exception:
+                pass
+
+    def _set_state(self, job, state):
+        job.state = state
+        self._record(job)
+        self._emit(job, 'state', state)
+
+    def start(self):
+        if self.read_only:
+            raise QueueBusy("A read-only queue can't run jobs.")
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+            self._dispatcher.start()
+        return self
+
+    def submit(self, kind, payload, priority=0, secrets=None):
+        if self.read_only:
+            raise QueueBusy("A read-only queue can't take jobs.")
+        if kind not in self.handlers:
+            raise ValueError(f"No handler for job kind '{kind}'.")
+        job = Job(kind, payload, priority)
+        job.secrets = dict(secrets or {})
+        with self._cond:
+            self._jobs[job.id] = job
+            self._push(job)
+            self._set_state(job, QUEUED)
+            self._cond.notify_all()
+        return job.id
+
+    def cancel(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.state in FINISHED:
+                return False
+            job.cancel_requested = True
+            if job.state == QUEUED:
+                self._set_state(job, CANCELLED)
+                self._cond.notify_all()
+                return True
+        if job.on_cancel:
+            job.on_cancel()
+        return True
+
+    def status(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return job.status() if job else None
+
+    def jobs(self, kind=None, states=None):
+        with self._cond:
+            return [job.status() for job in self._jobs.values()
+                    if (kind is None or job.kind == kind) and (states is None or job.state in states)]
+
+    def counts(self):
+        # {kind: {state: n}}
+        counts = {}
+        with self._cond:
+            for job in self._jobs.values():
+                counts.setdefault(job.kind, {}).setdefault(job.state, 0)
+                counts[job.kind][job.state] += 1
+        return counts
+
+    def wait(self, job_id=None, timeout=None):
+        # until that job (or every job) is finished; False on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                pending = [j for j in self._jobs.values() if j.state not in FINISHED and (job_id is None or j.id == job_id)]
+                if not pending:
+                    return True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait and self._dispatcher:
+            self._dispatcher.join()
+        with self._cond:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+            if self._owner:
+                self._owner.close()
+                self._owner = None
+
+    def _next_runnable(self):
+        # highest priority job whose kind still has a free slot; the others stay in the heap
+        skipped = []
+        found = None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            job = self._jobs.get(item[2])
+            if not job or job.state != QUEUED:
+                continue
+            if self._running.get(job.kind, 0) < self.limits.get(job.kind, 1):
+                found = job
+                break
+            skipped.append(item)
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return found
+
+    def _dispatch(self):
+        with self._cond:
+            while not self._stopping:
+                job = self._next_runnable()
+                if job is None:
+                    self._cond.wait()
+                    continue
+                self._running[job.kind] = self._running.get(job.kind, 0) + 1
+                job.attempts += 1
+                self._set_state(job, RUNNING)
+                threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job):
+        def report(event, data=None):
+            if event == 'checkpoint':
+                with self._cond:
+                    self._record(job)
+                return
+            if event == 'progress':
+                job.progress = data
+            self._emit(job, event, data)
+
+        try:
+            if job.cancel_requested:
+                raise JobCancelled()
+            # payload 'profile': 'cprofile' or 'sampling' profiles just this job
+            with telemetry.profile(f"{job.kind}_{job.id}", mode=job.payload.get('profile')) as prof, \
+                    telemetry.span(f"job.{job.kind}", job=job.id):
+                result = self.handlers[job.kind](job, report)
+            if prof.path:
+                report('profile', prof.path)
+            state = CANCELLED if job.cancel_requested else DONE
+            job.result = result
+        except JobCancelled:
+            state = CANCELLED
+        except Exception as e:
+            state = FAILED
+            job.error = str(e)
+
+        if telemetry.enabled():
+            telemetry.write_metrics()
+        with self._cond:
+            self._running[job.kind] -= 1
+            self._set_state(job, state)
+            self._cond.notify_all()
+
+
+# default handlers, shared by the gui and worker.py
+def _transcription_backend(job):
+    from services.transcription import get_backend
+
+    p = job.payload
+    name = p.get('backend', 'groq')
+    # resumed jobs have no secrets left, fall back to the environment
+    api_key = job.secrets.get('api_key') or os.getenv("GROQ_API_KEY", "")
+    if name == 'groq' and not api_key:
+        raise ValueError("Groq API Key was not provided.")
+    return get_backend(name, api_key=api_key, model_size=p.get('model', 'small'), threads=p.get('threads'),
+                       compute_type=p.get('compute_type', 'int8'))
+
+
+def run_watermark(job, report):
+    from services.video import VideoProcessor
+    from services.cache import file_digest
+
+    p = job.payload
+    # the file is replaced in place, so a job resumed after a crash must not watermark it twice
+    if 'source_hash' in p:
+        if file_digest(p['video_path']) != p['source_hash']:
+            # the atomic replace happened before the crash, the file already is the result
+            return {'video_path': p['video_path'], 'skipped': True}
+    else:
+        p['source_hash'] = file_digest(p['video_path'])
+        report('checkpoint')
+    processor = VideoProcessor(p['watermark_path'], engine=p.get('engine', 'moviepy'), segments=p.get('segments', 1))
+    processor.progress_callback = lambda frames, fps: report('encode', {'frames': frames, 'fps': fps})
+    if p.get('subtitles'):
+        # watermark + subtitles from a single decode of the source
+        from services.pipeline import watermark_and_subtitle
+        backend = _transcription_backend(job)
+        report('progress', 'encoding + transcribing')
+        output_path = watermark_and_subtitle(processor, None, p['video_path'], formats=tuple(p['subtitles']), backend=backend)
+        return {'video_path': p['video_path'], 'output_path': output_path}
+
+    success, error = processor.apply_watermark(p['video_path'])
+    if not success:
+        raise Exception(error)
+    return {'video_path': p['video_path']}
+
+
+def run_subtitle(job, report):
+    from services.subtitles import generate_subtitles
+
+    p = job.payload
+    backend = _transcription_backend(job)
+    report('progress', 'transcribing')
+    output_path = generate_subtitles(None, p['video_path'], formats=tuple(p.get('formats', ('srt',))), backend=backend)
+    return {'output_path': output_path}
+
+
+_hunt_storage = {}
+
+
+def run_hunt(job, report):
+    from services.youtube import YoutubeProspector
+    from services.metadata_cache import MetadataCache
+    from services.leads import LeadStore
+
+    if not _hunt_storage:
+        _hunt_storage['cache'] = MetadataCache()
+        _hunt_storage['store'] = LeadStore()
+
+    p = job.payload
+    prospector = YoutubeProspector(p['config'], lambda msg: report('log', msg),
+                                   cache=_hunt_storage['cache'], store=_hunt_storage['store'], event_callback=report)
+    job.on_cancel = lambda: setattr(prospector, 'stop_flag', True)
+    prospector.search(p['terms'])
+    return {'terms': len(p['terms'])}
+
+
+DEFAULT_HANDLERS = {
+    'watermark': run_watermark,
+    'subtitle': run_subtitle,
+    'hunt': run_hunt,
+}
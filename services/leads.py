@@ -0,0 +1,165 @@
+import os
+import csv
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+DB_PATH = "youtube_leads.db"
+# what the prospector wrote before there was a store
+CSV_PATH = "youtube_leads.csv"
+CSV_COLUMNS = ['Channel', 'Title', 'Views', 'Channel Link', 'Date']
+
+
+def _display_date(upload_date):
+    # YYYYMMDD in the store, DD/MM/YYYY in the csv like it always was
+    try:
+        return datetime.strptime(upload_date, '%Y%m%d').strftime('%d/%m/%Y')
+    except (TypeError, ValueError):
+        return upload_date
+
+
+def _upload_date(display_date):
+    try:
+        return datetime.strptime(display_date, '%d/%m/%Y').strftime('%Y%m%d')
+    except (TypeError, ValueError):
+        return display_date or None
+
+
+class LeadStore:
+    def __init__(self, path=DB_PATH, legacy_csv=CSV_PATH):
+        self.path = path
+        created = path == ":memory:" or not os.path.exists(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # channel_key is the channel id when known, else the channel link, else the name
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS leads (
+                channel_key TEXT PRIMARY KEY,
+                channel_id TEXT, channel TEXT, title TEXT, views INTEGER, channel_link TEXT,
+                upload_date TEXT, term TEXT, first_seen REAL NOT NULL, last_seen REAL NOT NULL,
+                exported_csv INTEGER NOT NULL DEFAULT 0, exported_jsonl INTEGER NOT NULL DEFAULT 0)""")
+            for column in ('channel', 'channel_id', 'channel_link', 'upload_date', 'views', 'term', 'first_seen'):
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_leads_{column} ON leads ({column})")
+        if created and legacy_csv and os.path.exists(legacy_csv):
+            # channels contacted before the store existed must stay known, and are already in the csv
+            self.import_csv(legacy_csv)
+
+    @staticmethod
+    def _key(lead):
+        return lead.get('Channel ID') or lead.get('Channel Link') or lead.get('Channel')
+
+    def upsert(self, leads):
+        # returns how many channels were new
+        now = time.time()
+        new = 0
+        with self._lock, self._conn:
+            for lead in leads:
+                key = self._key(lead)
+                if not key: continue
+                # the same channel may have been stored under its link before its id was known
+                existing = self._conn.execute("SELECT channel_key FROM leads WHERE channel_key = ? OR channel_link = ? OR channel_id = ? LIMIT 1",
+                                              (key, lead.get('Channel Link'), lead.get('Channel ID'))).fetchone()
+                if existing:
+                    key = existing['channel_key']
+                else:
+                    new += 1
+                # a channel seen again keeps its first_seen and export flags, the rest is refreshed
+                self._conn.execute("""INSERT INTO leads (channel_key, channel_id, channel, title, views, channel_link,
+                        upload_date, term, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(channel_key) DO UPDATE SET
+                        channel_id = COALESCE(excluded.channel_id, channel_id), channel = excluded.channel, title = excluded.title, views = excluded.views,
+                        channel_link = COALESCE(excluded.channel_link, channel_link),
+                        upload_date = excluded.upload_date, term = excluded.term, last_seen = excluded.last_seen""",
+                    (key, lead.get('Channel ID'), lead.get('Channel'), lead.get('Title'), lead.get('Views'),
+                     lead.get('Channel Link'), lead.get('Upload Date'), lead.get('Term'), now, now))
+        return new
+
+    def import_csv(self, path):
+        # rows of a csv written by save_csv/export_csv, stored as already exported; returns how many were new
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.DictReader(f, delimiter=';'))
+        leads = []
+        for row in rows:
+            link = row.get('Channel Link') or None
+            channel_id = link.rstrip('/').rsplit('/', 1)[1] if link and '/channel/' in link else None
+            try:
+                views = int(row['Views']) if row.get('Views') else None
+            except ValueError:
+                views = None
+            leads.append({'Channel': row.get('Channel') or None, 'Title': row.get('Title'), 'Views': views, 'Channel Link': link,
+                          'Channel ID': channel_id, 'Upload Date': _upload_date(row.get('Date')), 'Term': None})
+        new = self.upsert(leads)
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE leads SET exported_csv = 1 WHERE channel_key = ? OR channel_link = ? OR channel_id = ?",
+                                   [(self._key(lead), lead['Channel Link'], lead['Channel ID']) for lead in leads if self._key(lead)])
+        return new
+
+    def known_channels(self):
+        # (names, ids) of every stored lead, so hunts can skip them before extracting anything
+        with self._lock:
+            rows = self._conn.execute("SELECT channel, channel_id FROM leads").fetchall()
+        return {r['channel'] for r in rows if r['channel']}, {r['channel_id'] for r in rows if r['channel_id']}
+
+    def is_known(self, channel=None, channel_id=None, channel_link=None):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM leads WHERE channel_id = ? OR channel = ? OR channel_link = ? LIMIT 1",
+                                     (channel_id, channel, channel_link)).fetchone()
+        return row is not None
+
+    def query(self, since=None, until=None, min_views=None, max_views=None, term=None, limit=None):
+        # since/until are upload dates as YYYYMMDD
+        clauses, params = [], []
+        for clause, value in (("upload_date >= ?", since), ("upload_date <= ?", until),
+                              ("views >= ?", min_views), ("views <= ?", max_views), ("term = ?", term)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = "SELECT * FROM leads"
+        if clauses: sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY first_seen, rowid"
+        if limit: sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params).fetchall()]
+
+    def _pending(self, flag, only_new):
+        sql = "SELECT rowid, * FROM leads"
+        if only_new: sql += f" WHERE {flag} = 0"
+        return [dict(r) for r in self._conn.execute(sql + " ORDER BY first_seen, rowid").fetchall()]
+
+    def export_csv(self, path, only_new=True):
+        # appends only rows that weren't exported yet, returns how many
+        with self._lock:
+            rows = self._pending('exported_csv', only_new)
+            if not rows: return 0
+            file_exists = os.path.exists(path) and only_new
+            with open(path, 'a' if only_new else 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, delimiter=';')
+                if not file_exists:
+                    writer.writeheader()
+                writer.writerows({
+                    'Channel': r['channel'], 'Title': r['title'], 'Views': r['views'],
+                    'Channel Link': r['channel_link'], 'Date': _display_date(r['upload_date']),
+                } for r in rows)
+            with self._conn:
+                self._conn.executemany("UPDATE leads SET exported_csv = 1 WHERE rowid = ?", [(r['rowid'],) for r in rows])
+        return len(rows)
+
+    def export_jsonl(self, path, only_new=True):
+        with self._lock:
+            rows = self._pending('exported_jsonl', only_new)
+            if not rows: return 0
+            with open(path, 'a' if only_new else 'w', encoding='utf-8') as f:
+                for r in rows:
+                    record = {k: r[k] for k in ('channel_id', 'channel', 'title', 'views', 'channel_link', 'upload_date', 'term', 'first_seen')}
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            with self._conn:
+                self._conn.executemany("UPDATE leads SET exported_jsonl = 1 WHERE rowid = ?", [(r['rowid'],) for r in rows])
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from services.cache import file_digest
+
+MANIFEST_PATH = os.path.join(".cache", "manifest.json")
+
+# check() results
+CURRENT, PENDING, CHANGED, LOCKED, SUBTITLES = 'current', 'pending', 'changed', 'locked', 'subtitles'
+
+
+def _stat(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def settings_fingerprint(settings):
+    # settings: json-able dict of everything that changes the outputs
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+class Manifest:
+    # one entry per processed source: content hashes, the settings used and the outputs written.
+    # saved after every record, so an interrupted batch resumes from the last finished file
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    def _matches(self, path, stat, digest):
+        # stat first, the content hash only when size/mtime changed (touch, copy...)
+        if not os.path.exists(path):
+            return False
+        return _stat(path) == stat or file_digest(path) == digest
+
+    def check(self, source_path, output_path, settings):
+        # CURRENT: nothing to do. PENDING: never processed or its outputs are gone/changed.
+        # CHANGED: the source or the settings changed, process again.
+        # LOCKED: processed in place with other settings, the original is gone so redoing it would stack watermarks.
+        # SUBTITLES: processed in place and the video is fine, but subtitle files are missing: only those can be redone
+        with self._lock:
+            entry = self.entries.get(self._key(source_path))
+        if not entry:
+            return PENDING
+
+        in_place = self._key(source_path) == self._key(output_path)
+        if entry.get('state') == 'running':
+            # the last run died on this file. in place, the replace is atomic: if the content is no longer
+            # the source we started from, the finished output landed and only the record is missing
+            if not (in_place and os.path.exists(source_path) and file_digest(source_path) != entry['source_hash']):
+                return PENDING
+            entry = self._complete(source_path, output_path)
+        video = entry['outputs'].get('video')
+        output_ok = video == self._key(output_path) and self._matches(output_path, entry['output_stat'], entry['output_hash'])
+        same_settings = entry['settings_hash'] == settings_fingerprint(settings)
+
+        if in_place:
+            if not output_ok:
+                # replaced by something new since, treat it as a new source
+                return CHANGED
+            if not same_settings:
+                return LOCKED
+            if not all(os.path.exists(path) for path in entry['outputs'].get('subtitles', [])):
+                return SUBTITLES
+        else:
+            if not self._matches(source_path, entry['source_stat'], entry['source_hash']):
+                return CHANGED
+            if not same_settings:
+                return CHANGED
+            if not output_ok:
+                return PENDING
+
+        if not all(os.path.exists(path) for path in entry['outputs'].get('subtitles', [])):
+            return PENDING
+        return CURRENT
+
+    def entry(self, source_path):
+        with self._lock:
+            entry = self.entries.get(self._key(source_path))
+            return dict(entry) if entry else None
+
+    def begin(self, source_path, source_hash, output_path, settings, subtitles=()):
+        # written before the file is processed, see the 'running' case in check()
+        with self._lock:
+            self.entries[self._key(source_path)] = {
+                'state': 'running',
+                'source_hash': source_hash,
+                'settings': settings,
+                'settings_hash': settings_fingerprint(settings),
+                'outputs': {'video': self._key(output_path), 'subtitles': [self._key(p) for p in subtitles]},
+            }
+            self._save()
+
+    def _complete(self, source_path, output_path):
+        with self._lock:
+            entry = self.entries[self._key(source_path)]
+            entry.update(state='done', source_stat=None, output_hash=file_digest(output_path), output_stat=_stat(output_path),
+                         processed_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+            self._save()
+        return entry
+
+    def record(self, source_path, source_hash, output_path, settings, subtitles=(), output_hash=None):
+        # source_hash is taken before processing, since an in-place run overwrites the source
+        in_place = self._key(source_path) == self._key(output_path)
+        entry = {
+            'state': 'done',
+            'source_hash': source_hash,
+            'source_stat': None if in_place else _stat(source_path),
+            'output_hash': output_hash or file_digest(output_path),
+            'output_stat': _stat(output_path),
+            'settings': settings,
+            'settings_hash': settings_fingerprint(settings),
+            'outputs': {'video': self._key(output_path), 'subtitles': [self._key(p) for p in subtitles]},
+            'processed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with self._lock:
+            self.entries[self._key(source_path)] = entry
+            self._save()
+        return entry
+
+    def forget(self, source_path):
+        with self._lock:
+            if self.entries.pop(self._key(source_path), None) is not None:
+                self._save()
+
+    def _save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp, self.path)
@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+DB_PATH = os.path.join(".cache", "metadata.sqlite3")
+
+HOUR = 3600
+DAY = 24 * HOUR
+# seconds each field stays fresh, None = never goes stale
+FIELD_TTL = {
+    'view_count': 6 * HOUR,
+    'title': 7 * DAY,
+    'uploader': 7 * DAY,
+    'channel': 7 * DAY,
+    'uploader_url': 30 * DAY,
+    'channel_url': None,
+    'channel_id': None,
+    'duration': None,
+    'upload_date': None,
+}
+# everything the prospector reads from a fully extracted video
+DETAIL_FIELDS = ('uploader', 'view_count', 'duration', 'upload_date', 'title', 'uploader_url', 'channel_url', 'channel_id')
+
+
+class MetadataCache:
+    def __init__(self, path=DB_PATH, ttl=None):
+        self.path = path
+        self.ttl = {**FIELD_TTL, **(ttl or {})}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # shared by the detail worker threads, access goes through the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS video_fields (
+                video_id TEXT NOT NULL, field TEXT NOT NULL, value TEXT, fetched_at REAL NOT NULL,
+                PRIMARY KEY (video_id, field))""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS channels (
+                channel_id TEXT PRIMARY KEY, uploader TEXT, channel_url TEXT, uploader_url TEXT, fetched_at REAL NOT NULL)""")
+
+    def _is_fresh(self, field, fetched_at, now):
+        ttl = self.ttl.get(field)
+        return ttl is None or now - fetched_at <= ttl
+
+    def fresh_fields(self, video_id):
+        # whatever is still fresh for this video, doesn't count as a hit or miss
+        if not video_id: return {}
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute("SELECT field, value, fetched_at FROM video_fields WHERE video_id = ?", (video_id,)).fetchall()
+        return {field: json.loads(value) for field, value, fetched_at in rows if self._is_fresh(field, fetched_at, now)}
+
+    def get_video(self, video_id, required=DETAIL_FIELDS):
+        fields = self.fresh_fields(video_id)
+        with self._lock:
+            if not fields or any(field not in fields for field in required):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {'id': video_id, **fields}
+
+    def put_video(self, info, complete=True):
+        # complete=False for flat listing entries: their missing/None fields mean "unknown", not "empty"
+        video_id = info.get('id') if info else None
+        if not video_id: return
+
+        now = time.time()
+        rows = [(video_id, field, json.dumps(info.get(field)), now)
+                for field in self.ttl if field in info and (complete or info.get(field) is not None)]
+        if complete:
+            rows += [(video_id, field, json.dumps(None), now) for field in DETAIL_FIELDS if field not in info]
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO video_fields VALUES (?, ?, ?, ?)", rows)
+            if complete and info.get('channel_id'):
+                self._conn.execute("INSERT OR REPLACE INTO channels VALUES (?, ?, ?, ?, ?)", (
+                    info['channel_id'], info.get('uploader'), info.get('channel_url'), info.get('uploader_url'), now))
+
+    def get_channel(self, channel_id):
+        with self._lock:
+            row = self._conn.execute("SELECT uploader, channel_url, uploader_url, fetched_at FROM channels WHERE channel_id = ?",
+                                     (channel_id,)).fetchone()
+        if not row: return None
+        return {'channel_id': channel_id, 'uploader': row[0], 'channel_url': row[1], 'uploader_url': row[2], 'fetched_at': row[3]}
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': round(self.hits / total, 3) if total else 0.0}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,176 @@
+import os
+import time
+import queue
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from services import ffmpeg, telemetry
+from services.audio import GroqService, SubtitleWriter, iter_merge_segments, segments_of
+from services.subtitles import default_cache, generate_subtitles
+
+# same audio extract_audio makes (mono 16kHz 32kbps mp3), cut into chunks while the video encodes
+SEGMENT_SECONDS = 300
+AUDIO_BITRATE = 32000
+# mpeg-2 layer iii at 16kHz/32kbps: 576 samples in exactly 144 bytes, no padding, no headers
+# (id3 and xing are turned off), so byte offsets map straight to timestamps
+MP3_FRAME_BYTES = 144
+# ~1s of the previous chunk is sent again so words cut at the seam are heard whole
+OVERLAP_FRAMES = 28
+
+
+def _seconds(size):
+    return size * 8 / AUDIO_BITRATE
+
+
+class _ChunkWatcher:
+    # the segment muxer opens chunk N+1 only after closing chunk N, so every chunk but the newest is complete
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = 0
+        self.offset = 0
+        self.tail = b""
+
+    def _path(self, index):
+        return os.path.join(self.directory, f"chunk_{index:03d}.mp3")
+
+    def ready(self, finished=False):
+        # (offset in seconds, bytes to upload) for every chunk completed since the last call
+        while os.path.exists(self._path(self.index)) and (finished or os.path.exists(self._path(self.index + 1))):
+            with open(self._path(self.index), "rb") as f:
+                data = f.read()
+            os.remove(self._path(self.index))
+            self.index += 1
+            if not data: continue
+
+            start = _seconds(self.offset - len(self.tail))
+            self.offset += len(data)
+            upload = self.tail + data
+            self.tail = data[-OVERLAP_FRAMES * MP3_FRAME_BYTES:]
+            yield start, upload
+
+
+def _audio_output_args(directory, segment_seconds):
+    return ['-map', '0:a:0', '-vn', '-ac', '1', '-ar', '16000', '-c:a', 'libmp3lame', '-b:a', str(AUDIO_BITRATE),
+            '-f', 'segment', '-segment_time', str(segment_seconds), '-segment_format', 'mp3',
+            '-segment_format_options', 'id3v2_version=0:write_xing=0', '-reset_timestamps', '1',
+            os.path.join(directory, "chunk_%03d.mp3")]
+
+
+def watermark_and_subtitle(processor, api_key, video_path, formats=('srt',), workers=4, cache=None, use_cache=True,
+                           base_url=None, segment_seconds=SEGMENT_SECONDS, poll_interval=0.2, output_path=None, backend=None):
+    # decodes the source once: one ffmpeg process writes the watermarked video and the transcription audio,
+    # and chunks are transcribed while the encode is still running. returns the first subtitle path.
+    # the video goes to output_path (default: replaces the source), the subtitles next to it
+    if not os.path.exists(processor.watermark_image_path):
+        raise Exception(f"Image '{processor.watermark_image_path}' not found.")
+
+    output_path = output_path or video_path
+    outputs = SubtitleWriter.outputs_for(output_path, formats)
+    cache = (cache or default_cache()) if use_cache else None
+    if backend is not None and backend.name != 'groq':
+        # the chunk streaming is built around uploads; a local model reads the source itself,
+        # so it runs first, while the original is still there, and the watermark after it
+        subtitle_path = generate_subtitles(None, video_path, outputs[formats[0]], formats, cache=cache, use_cache=use_cache, backend=backend)
+        success, error = processor.apply_watermark(video_path, output_path)
+        if not success: raise Exception(error)
+        return subtitle_path
+    if backend is not None:
+        api_key, base_url, workers = backend.api_key, backend.base_url, backend.workers
+    if not api_key: raise ValueError("Groq API Key was not provided.")
+    # the key has to come from the original content, the file is replaced at the end
+    key = cache.key(video_path, GroqService.MODEL, GroqService.LANGUAGE) if cache else None
+    segments = cache.get(key) if cache else None
+    if segments is not None:
+        # already transcribed, only the watermark is left to do
+        success, error = processor.apply_watermark(video_path, output_path)
+        if not success: raise Exception(error)
+        with SubtitleWriter(outputs) as writer:
+            writer.write_all(segments)
+        return outputs[formats[0]]
+
+    temp_path = output_path + ".temp.mp4"
+    with tempfile.TemporaryDirectory() as tmp:
+        info, inputs, filters = processor.overlay_args(video_path, tmp)
+        if not info['has_audio']:
+            raise Exception(f"'{video_path}' has no audio track to transcribe.")
+        audio_codec = ffmpeg.mp4_audio_codec(info)
+        chunk_dir = os.path.join(tmp, "chunks")
+        os.makedirs(chunk_dir)
+
+        args = [*inputs, *filters, *processor.encoder_args(), '-map', '0:a:0', '-c:a', audio_codec,
+                '-movflags', '+faststart', temp_path, *_audio_output_args(chunk_dir, segment_seconds)]
+        try:
+            with telemetry.span('pipeline.watermark_and_subtitle', engine='ffmpeg'):
+                segments = _run(args, api_key, outputs, chunk_dir, os.path.join(tmp, "ffmpeg.log"), workers, base_url, poll_interval,
+                                processor.report_ffmpeg_progress, keep=cache is not None)
+        except Exception:
+            if os.path.exists(temp_path): os.remove(temp_path)
+            raise
+
+    os.replace(temp_path, output_path)
+    if cache:
+        cache.put(key, segments)
+    return outputs[formats[0]]
+
+
+def _run(args, api_key, outputs, chunk_dir, log_path, workers, base_url, poll_interval, on_progress, keep=False):
+    # keep: return the merged segments (for the cache), otherwise they only go to the subtitle files
+    watcher = _ChunkWatcher(chunk_dir)
+    pending = deque()
+    # (offset, segments) in chunk order, None when done; merged and written on their own thread
+    results = queue.Queue()
+    written = [] if keep else None
+    errors = []
+
+    def write():
+        try:
+            with SubtitleWriter(outputs) as writer:
+                for entry in iter_merge_segments(iter(results.get, None)):
+                    writer.write(entry)
+                    if keep: written.append(entry)
+        except Exception as e:
+            errors.append(e)
+
+    def transcribe(data):
+        return segments_of(GroqService.transcribe_bytes(api_key, data, "chunk.mp3", base_url=base_url))
+
+    def collect(finished):
+        for offset, data in watcher.ready(finished):
+            pending.append((offset, pool.submit(transcribe, data)))
+        # hand over finished chunks in order, the merge needs them sorted
+        while pending and (finished or pending[0][1].done()):
+            offset, future = pending.popleft()
+            results.put((offset, future.result()))
+
+    writer = threading.Thread(target=write, daemon=True)
+    writer.start()
+    process = None
+    with open(log_path, "wb") as log, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        try:
+            try:
+                process = ffmpeg.popen_progress(args, on_progress, stderr=log)
+            except FileNotFoundError:
+                raise Exception("Error running FFmpeg. Check if FFmpeg is installed and in PATH.")
+
+            while process.poll() is None:
+                collect(False)
+                time.sleep(poll_interval)
+            if process.returncode != 0:
+                with open(log_path, "rb") as f:
+                    error = f.read().decode(errors='ignore').strip().splitlines()
+                raise Exception(f"FFmpeg failed: {error[-1] if error else 'unknown error'}")
+            collect(True)
+        except BaseException:
+            if process and process.poll() is None:
+                process.kill()
+                process.wait()
+            for _, future in pending:
+                future.cancel()
+            raise
+        finally:
+            results.put(None)
+            writer.join()
+
+    if errors: raise errors[0]
+    return written
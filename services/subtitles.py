@@ -0,0 +1,67 @@
+import os
+import tempfile
+from services.cache import TranscriptionCache
+from services.audio import AudioProcessor, GroqService, SubtitleWriter, iter_merge_segments, segments_of
+
+
+def iter_transcribe_video(api_key, video_path, workers=4, base_url=None):
+    # short videos never touch the disk: ffmpeg's stdout goes straight into the upload.
+    # too big for one request: chunking needs a real file, so the rest of the same stream
+    # goes into a private temp one
+    fd, temp_audio = tempfile.mkstemp(suffix=".mp3")
+    os.close(fd)
+    try:
+        data = AudioProcessor.extract_audio_bytes(video_path, max_bytes=GroqService.MAX_UPLOAD_BYTES, spill_path=temp_audio)
+        if data is not None:
+            result = GroqService.transcribe_bytes(api_key, data, os.path.basename(video_path) + ".mp3", base_url=base_url)
+            yield from iter_merge_segments([(0.0, segments_of(result))])
+            return
+        yield from GroqService.iter_transcribe_chunked(api_key, temp_audio, workers=workers, base_url=base_url)
+    finally:
+        if os.path.exists(temp_audio): os.remove(temp_audio)
+
+
+def transcribe_video(api_key, video_path, **kwargs):
+    return list(iter_transcribe_video(api_key, video_path, **kwargs))
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TranscriptionCache()
+    return _default_cache
+
+
+def generate_subtitles(api_key, video_path, output_path=None, formats=('srt',), cache=None, use_cache=True, backend=None, **kwargs):
+    # returns the path of the first format written (the .srt by default).
+    # backend: a services.transcription backend, groq with api_key (and kwargs) when not given
+    if backend is None:
+        from services.transcription import GroqBackend
+        backend = GroqBackend(api_key, **kwargs)
+    outputs = SubtitleWriter.outputs_for(output_path or video_path, formats)
+    if output_path:
+        outputs[formats[0]] = output_path
+    cache = (cache or default_cache()) if use_cache else None
+
+    # a hit goes straight to the subtitle writer: no extraction, no api call
+    segments = None
+    if cache:
+        key = cache.key(video_path, backend.model_id, backend.language)
+        segments = cache.get(key)
+
+    with SubtitleWriter(outputs) as writer:
+        if segments is not None:
+            writer.write_all(segments)
+        else:
+            # chunks are written as soon as they are merged
+            segments = []
+            for entry in backend.iter_transcribe(video_path):
+                writer.write(entry)
+                if cache: segments.append(entry)
+            if cache:
+                cache.put(key, segments)
+
+    return outputs[formats[0]]
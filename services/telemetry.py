@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from collections import Counter, defaultdict
+
+TRACE_PATH = os.path.join(".cache", "trace.jsonl")
+METRICS_PATH = os.path.join(".cache", "metrics.prom")
+PROFILE_DIR = os.path.join(".cache", "profiles")
+
+# off by default: span() and count() then return right away without touching any state
+_enabled = False
+_trace = None
+_metrics_path = None
+_lock = threading.Lock()
+_local = threading.local()
+# span name -> [count, total seconds, errors]
+_spans = defaultdict(lambda: [0, 0.0, 0])
+# (counter name, sorted label items) -> value
+_counters = Counter()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.id = uuid.uuid4().hex[:16]
+        self.parent = None
+
+    def set(self, **attrs):
+        # attributes only known at the end (bytes written, frames...)
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].id if stack else None
+        stack.append(self)
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        record = {'span': self.name, 'id': self.id, 'parent': self.parent, 'start': round(self.wall, 6),
+                  'duration': round(duration, 6), 'thread': threading.current_thread().name, 'pid': os.getpid()}
+        if self.attrs: record['attrs'] = self.attrs
+        if exc_type is not None: record['error'] = exc_type.__name__
+        _finish(record)
+        return False
+
+
+def enable(trace_path=TRACE_PATH, metrics_path=METRICS_PATH):
+    global _enabled, _trace, _metrics_path
+    with _lock:
+        if trace_path:
+            if os.path.dirname(trace_path):
+                os.makedirs(os.path.dirname(trace_path), exist_ok=True)
+            # line buffered: several processes (batch workers) can append to the same trace
+            _trace = open(trace_path, 'a', encoding='utf-8', buffering=1)
+        _metrics_path = metrics_path
+        _enabled = True
+
+
+def disable():
+    global _enabled, _trace
+    write_metrics()
+    with _lock:
+        _enabled = False
+        if _trace:
+            _trace.close()
+            _trace = None
+
+
+def enabled():
+    return _enabled
+
+
+def span(name, **attrs):
+    # with span('audio.extract', video=path) as s: ... ; s.set(bytes=n)
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def count(name, n=1, **labels):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[(name, tuple(sorted(labels.items())))] += n
+
+
+def _finish(record):
+    with _lock:
+        stats = _spans[record['span']]
+        stats[0] += 1
+        stats[1] += record['duration']
+        if 'error' in record: stats[2] += 1
+        if _trace:
+            _trace.write(json.dumps(record, default=str) + "\n")
+
+
+def summarize(trace_path=TRACE_PATH, since=None):
+    # span stats rebuilt from a trace file, e.g. one written by several processes; since = epoch seconds
+    spans = defaultdict(lambda: [0, 0.0, 0])
+    with open(trace_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if since is not None and record['start'] < since:
+                continue
+            stats = spans[record['span']]
+            stats[0] += 1
+            stats[1] += record['duration']
+            if 'error' in record: stats[2] += 1
+    return spans
+
+
+def _metric_name(name):
+    return "yat_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _labels(items):
+    if not items: return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items) + "}"
+
+
+def render_metrics(spans=None, counters=None):
+    # prometheus text exposition format
+    with _lock:
+        spans = dict(_spans if spans is None else spans)
+        counters = dict(_counters if counters is None else counters)
+
+    lines = ["# HELP yat_stage_seconds Time spent in each instrumented stage.", "# TYPE yat_stage_seconds summary"]
+    for name, (calls, total, _) in sorted(spans.items()):
+        lines.append(f'yat_stage_seconds_count{{stage="{name}"}} {calls}')
+        lines.append(f'yat_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+    lines += ["# HELP yat_stage_errors_total Stage runs that raised.", "# TYPE yat_stage_errors_total counter"]
+    for name, (_, _, errors) in sorted(spans.items()):
+        lines.append(f'yat_stage_errors_total{{stage="{name}"}} {errors}')
+
+    by_name = defaultdict(list)
+    for (name, labels), value in counters.items():
+        by_name[name].append((labels, value))
+    for name, values in sorted(by_name.items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines += [f"{metric}{_labels(labels)} {value}" for labels, value in sorted(values)]
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path=None, spans=None, counters=None):
+    path = path or _metrics_path
+    if not path: return None
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(render_metrics(spans, counters))
+    os.replace(tmp, path)
+    return path
+
+
+class _Sampler:
+    # samples one thread's stack every interval; output is collapsed stacks (flamegraph.pl / speedscope)
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+class profile:
+    # opt-in profiling of one block (one job): mode is 'cprofile' or 'sampling', anything else is a no-op
+    def __init__(self, name, mode='cprofile', directory=PROFILE_DIR, interval=0.005):
+        self.name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+        self.mode = mode
+        self.directory = directory
+        self.interval = interval
+        self.path = None
+        self._profiler = None
+
+    def __enter__(self):
+        if self.mode == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.mode == 'sampling':
+            self._profiler = _Sampler(threading.get_ident(), self.interval).__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profiler is None:
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        stem = os.path.join(self.directory, f"{self.name}_{time.strftime('%Y%m%d_%H%M%S')}")
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+            # open with: python -m pstats <file>, snakeviz, ...
+            self.path = stem + ".prof"
+            self._profiler.dump_stats(self.path)
+        else:
+            self._profiler.__exit__(*exc)
+            self.path = stem + ".folded"
+            with open(self.path, 'w', encoding='utf-8') as f:
+                for stack, samples in self._profiler.stacks.most_common():
+                    f.write(f"{stack} {samples}\n")
+        return False
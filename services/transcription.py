@@ -0,0 +1,144 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from services import telemetry
+from services.audio import GroqService, iter_merge_segments
+
+# faster-whisper model sizes that run reasonably on a cpu (large-v3 works too, just slowly)
+LOCAL_MODELS = ('tiny', 'base', 'small', 'medium', 'large-v3', 'distil-large-v3')
+
+
+class TranscriptionBackend(ABC):
+    # every backend yields the same merged segment dicts ({'id', 'start', 'end', 'text', ...}) that
+    # SubtitleWriter and SRTConverter take, in order, as soon as they are ready
+    name = None
+
+    @property
+    @abstractmethod
+    def model_id(self):
+        # goes into the transcription cache key and the batch manifest: different models never share results
+        pass
+
+    @property
+    @abstractmethod
+    def language(self):
+        pass
+
+    @abstractmethod
+    def iter_transcribe(self, video_path):
+        pass
+
+    @abstractmethod
+    def transcribe_audio(self, audio_path):
+        # a plain audio file, used by the benchmark to compare backends on the same input
+        pass
+
+
+class GroqBackend(TranscriptionBackend):
+    name = 'groq'
+
+    def __init__(self, api_key, base_url=None, workers=4):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.workers = workers
+
+    @property
+    def model_id(self):
+        # the plain model name, so results cached before there were backends stay valid
+        return GroqService.MODEL
+
+    @property
+    def language(self):
+        return GroqService.LANGUAGE
+
+    def iter_transcribe(self, video_path):
+        from services.subtitles import iter_transcribe_video
+        if not self.api_key: raise ValueError("Groq API Key was not provided.")
+        return iter_transcribe_video(self.api_key, video_path, workers=self.workers, base_url=self.base_url)
+
+    def transcribe_audio(self, audio_path):
+        return GroqService.transcribe_chunked(self.api_key, audio_path, workers=self.workers, base_url=self.base_url)
+
+
+def load_backends():
+    # optional dependency: pip install faster-whisper (ctranslate2 underneath)
+    try:
+        import faster_whisper
+    except ImportError:
+        raise ImportError("The local Whisper backend needs faster-whisper: pip install faster-whisper")
+    return faster_whisper
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    # whisper on the cpu through ctranslate2: nothing is uploaded and it works offline.
+    # int8 weights keep a 'small' model around 0.5GB of ram and a few times faster than real time on 8 cores
+    name = 'local'
+
+    def __init__(self, model_size='small', threads=None, compute_type='int8', language=GroqService.LANGUAGE, beam_size=5):
+        self.model_size = model_size
+        self.threads = threads or os.cpu_count() or 1
+        self.compute_type = compute_type
+        self._language = language
+        self.beam_size = beam_size
+
+    @property
+    def model_id(self):
+        return f"faster-whisper-{self.model_size}-{self.compute_type}"
+
+    @property
+    def language(self):
+        return self._language
+
+    def _model(self):
+        # loading takes seconds, so models are kept for the life of the process (one per size/precision/threads).
+        # a model runs one transcription at a time, extra jobs wait for it instead of oversubscribing the cpu
+        key = (self.model_size, self.compute_type, self.threads)
+        with _models_lock:
+            if key not in _models:
+                faster_whisper = load_backends()
+                with telemetry.span('whisper.load', model=self.model_size, compute_type=self.compute_type):
+                    model = faster_whisper.WhisperModel(self.model_size, device='cpu', compute_type=self.compute_type,
+                                                        cpu_threads=self.threads, num_workers=1)
+                _models[key] = (model, threading.Lock())
+            return _models[key]
+
+    def _segments(self, path):
+        if not os.path.exists(path): raise FileNotFoundError("Media file not found.")
+        model, lock = self._model()
+        with lock, telemetry.span('whisper.transcribe', model=self.model_size, threads=self.threads) as span:
+            # faster-whisper decodes the audio track itself, any container ffmpeg can read works
+            segments, info = model.transcribe(path, language=self._language, beam_size=self.beam_size, vad_filter=True)
+            count = 0
+            for s in segments:
+                count += 1
+                yield {
+                    'id': s.id, 'seek': s.seek, 'start': s.start, 'end': s.end, 'text': s.text,
+                    'tokens': list(s.tokens), 'temperature': s.temperature, 'avg_logprob': s.avg_logprob,
+                    'compression_ratio': s.compression_ratio, 'no_speech_prob': s.no_speech_prob,
+                }
+            span.set(audio_seconds=round(info.duration, 3), segments=count)
+
+    def iter_transcribe(self, video_path):
+        # segments come out of the model one by one, so the subtitle files grow while it runs
+        return iter_merge_segments([(0.0, self._segments(video_path))])
+
+    def transcribe_audio(self, audio_path):
+        return list(self.iter_transcribe(audio_path))
+
+
+BACKENDS = {
+    'groq': GroqBackend,
+    'local': LocalWhisperBackend,
+}
+
+
+def get_backend(name='groq', api_key=None, base_url=None, workers=4, model_size='small', threads=None, compute_type='int8'):
+    if name == 'groq':
+        return GroqBackend(api_key, base_url=base_url, workers=workers)
+    if name == 'local':
+        return LocalWhisperBackend(model_size, threads=threads, compute_type=compute_type)
+    raise ValueError(f"Unknown transcription backend '{name}'.")
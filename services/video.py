@@ -1,49 +1,285 @@
 import os
-import numpy as np
-import PIL.Image
-# imports config to make sure pillow is right
-import config 
-from moviepy.editor import VideoFileClip, ImageClip, CompositeVideoClip
+import hashlib
+import tempfile
+import time
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from services import ffmpeg, telemetry
+
+# prepared overlays are small (cropped), but keep only the last few resolutions around
+OVERLAY_CACHE_SIZE = 8
+_overlay_cache = OrderedDict()
+_overlay_lock = threading.Lock()
+
+
+def _imaging():
+    # numpy and pillow are imported on first use, not when the app starts
+    import numpy
+    import PIL.Image
+    # fix for newer pillow versions, moviepy still asks for ANTIALIAS
+    if not hasattr(PIL.Image, 'ANTIALIAS'):
+        PIL.Image.ANTIALIAS = PIL.Image.LANCZOS # type: ignore
+    return numpy, PIL.Image
+
+
+def _moviepy():
+    _imaging()
+    from moviepy.editor import VideoFileClip
+    return VideoFileClip
+
+
+def load_backends():
+    # everything the watermark tab needs, for prewarming in the background
+    _imaging()
+    _moviepy()
+
+
+class PreparedOverlay:
+    # watermark already resized, cropped to its visible box and premultiplied by alpha*opacity
+    def __init__(self, box, rgba, premultiplied, inverse_alpha):
+        self.box = box  # (left, top, right, bottom) in frame coordinates
+        self.rgba = rgba  # uint8 (h, w, 4) with alpha already scaled by opacity, used by ffmpeg
+        self.premultiplied = premultiplied  # float32 (h, w, 3): rgb * alpha * opacity
+        self.inverse_alpha = inverse_alpha  # float32 (h, w, 1): 1 - alpha * opacity
+
+    def blend(self, frame):
+        if self.box is None:
+            return frame
+        np, _ = _imaging()
+        left, top, right, bottom = self.box
+        # frames coming from the reader are read-only
+        out = np.array(frame, copy=True)
+        roi = out[top:bottom, left:right].astype(np.float32)
+        roi *= self.inverse_alpha
+        roi += self.premultiplied
+        out[top:bottom, left:right] = roi.astype(np.uint8)
+        return out
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def prepare_overlay(image_path, size, opacity):
+    key = (_file_hash(image_path), tuple(size), float(opacity))
+    with _overlay_lock:
+        if key in _overlay_cache:
+            _overlay_cache.move_to_end(key)
+            return _overlay_cache[key]
+
+    np, Image = _imaging()
+    pil_img = Image.open(image_path).convert('RGBA')
+    # resize image to match video size
+    pil_img = pil_img.resize(tuple(size), Image.LANCZOS) # type: ignore
+
+    # only blend where the watermark is actually visible
+    box = pil_img.getchannel('A').getbbox()
+    if box is None:
+        overlay = PreparedOverlay(None, None, None, None)
+    else:
+        img_array = np.asarray(pil_img.crop(box), dtype=np.uint8)
+        alpha = img_array[:, :, 3:4].astype(np.float32) * (float(opacity) / 255.0)
+        premultiplied = img_array[:, :, :3].astype(np.float32) * alpha
+        rgba = img_array.copy()
+        rgba[:, :, 3] = np.rint(alpha[:, :, 0] * 255.0).astype(np.uint8)
+        overlay = PreparedOverlay(box, rgba, premultiplied, 1.0 - alpha)
+
+    with _overlay_lock:
+        _overlay_cache[key] = overlay
+        while len(_overlay_cache) > OVERLAY_CACHE_SIZE:
+            _overlay_cache.popitem(last=False)
+    return overlay
+
 
 class VideoProcessor:
-    def __init__(self, watermark_image_path):
+    ENGINES = ('moviepy', 'ffmpeg')
+
+    def __init__(self, watermark_image_path, opacity=0.3, engine='moviepy', preset='medium', crf=23, threads=None, segments=1):
         self.watermark_image_path = watermark_image_path
+        self.opacity = opacity
+        # moviepy decodes every frame into numpy, ffmpeg does the overlay in a single native process
+        self.engine = engine
+        # encoder settings shared by both engines (libx264 defaults)
+        self.preset = preset
+        self.crf = crf
+        self.threads = threads
+        # >1: split at keyframes and encode that many pieces in parallel ffmpeg processes (same overlay as the ffmpeg engine)
+        self.segments = segments
+        # optional progress_callback(frames, fps) while encoding, called from the encoding thread
+        self.progress_callback = None
 
-    def apply_watermark(self, video_path):
+    def apply_watermark(self, video_path, output_path=None):
+        # without output_path the source is replaced; either way the result only lands once it is complete
         if not os.path.exists(self.watermark_image_path):
             return False, f"Image '{self.watermark_image_path}' not found."
+        if self.engine not in self.ENGINES:
+            return False, f"Unknown watermark engine '{self.engine}'."
 
+        output_path = output_path or video_path
+        temp_path = output_path + ".temp.mp4"
         try:
-            video_clip = VideoFileClip(video_path)
-            pil_img = PIL.Image.open(self.watermark_image_path).convert('RGBA')
-            
-            # resize image to match video size
-            pil_img_resized = pil_img.resize(video_clip.size, PIL.Image.LANCZOS) # type: ignore
-            
-            img_array = np.array(pil_img_resized)
-            rgb_image = img_array[:, :, :3]
-            alpha_mask = img_array[:, :, 3] / 255.0
-            
-            image_clip = ImageClip(rgb_image).set_mask(ImageClip(alpha_mask, ismask=True))
-            opacity_image = image_clip.set_opacity(0.3)
-            
-            final_image = opacity_image.set_position(("center", "center"))
-            final_image = final_image.set_duration(video_clip.duration)
-
-            final_video = CompositeVideoClip([video_clip, final_image])
-
-            temp_path = video_path + ".temp.mp4"
-            
-            # use threads to speed up writing if possible
-            final_video.write_videofile(temp_path, codec="libx264", audio_codec="aac", verbose=False, logger=None)
-
-            video_clip.close()
-            image_clip.close()
-            final_video.close()
+            with telemetry.span('video.encode', engine=self.engine, preset=self.preset, segments=self.segments):
+                if self.segments > 1:
+                    self._watermark_segments(video_path, temp_path)
+                elif self.engine == 'ffmpeg':
+                    self._watermark_ffmpeg(video_path, temp_path)
+                else:
+                    self._watermark_moviepy(video_path, temp_path)
 
-            os.remove(video_path)
-            os.rename(temp_path, video_path)
+            # atomic, a crash can't leave the video missing between a remove and a rename
+            os.replace(temp_path, output_path)
 
             return True, None
         except Exception as e:
-            return False, str(e)
\ No newline at end of file
+            if os.path.exists(temp_path): os.remove(temp_path)
+            return False, str(e)
+
+    def _watermark_moviepy(self, video_path, output_path):
+        video_clip = _moviepy()(video_path)
+        try:
+            overlay = prepare_overlay(self.watermark_image_path, video_clip.size, self.opacity)
+
+            # same result as compositing a centered full-frame ImageClip, but only touches the visible box
+            blend = overlay.blend
+            if self.progress_callback:
+                blend = self._counting(blend)
+            final_video = video_clip.fl_image(blend)
+
+            # use threads to speed up writing if possible
+            final_video.write_videofile(output_path, codec="libx264", audio_codec="aac", preset=self.preset,
+                                        threads=self.threads, ffmpeg_params=['-crf', str(self.crf)],
+                                        verbose=False, logger=None)
+            final_video.close()
+        finally:
+            video_clip.close()
+
+    def _counting(self, blend, interval=0.5):
+        # reports frames and fps every interval seconds instead of on every frame
+        start = last = time.monotonic()
+        frames = 0
+
+        def counted(frame):
+            nonlocal last, frames
+            frames += 1
+            now = time.monotonic()
+            if now - last >= interval:
+                last = now
+                self.progress_callback(frames, frames / (now - start))
+            return blend(frame)
+        return counted
+
+    def report_ffmpeg_progress(self, block):
+        # callback for ffmpeg.popen_progress
+        if not self.progress_callback: return
+        try:
+            frames, fps = int(block.get('frame', 0)), float(block.get('fps', 0))
+        except ValueError:
+            return
+        self.progress_callback(frames, fps)
+
+    def encoder_args(self):
+        args = ['-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf), '-pix_fmt', 'yuv420p']
+        if self.threads:
+            args += ['-threads', str(self.threads)]
+        return args
+
+    def overlay_args(self, video_path, tmp_dir):
+        # ffmpeg inputs and video filter/map for the watermarked stream; the overlay png goes in tmp_dir
+        info = ffmpeg.probe(video_path)
+        overlay = prepare_overlay(self.watermark_image_path, (info['width'], info['height']), self.opacity)
+        if overlay.box is None:
+            # fully transparent watermark, nothing to draw
+            return info, ['-i', video_path], ['-map', '0:v:0']
+
+        # same resized/cropped image the moviepy engine blends, blended in rgb like moviepy does
+        overlay_png = os.path.join(tmp_dir, "overlay.png")
+        _, Image = _imaging()
+        Image.fromarray(overlay.rgba).save(overlay_png)
+        left, top = overlay.box[:2]
+        graph = f"[0:v]format=rgb24[base];[base][1:v]overlay={left}:{top}:format=rgb,format=yuv420p[out]"
+        return info, ['-i', video_path, '-i', overlay_png], ['-filter_complex', graph, '-map', '[out]']
+
+    def _watermark_ffmpeg(self, video_path, output_path):
+        with tempfile.TemporaryDirectory() as tmp:
+            info, inputs, filters = self.overlay_args(video_path, tmp)
+            # the audio is never touched: copied, or aac for codecs mp4 can't hold, decided before the one encode
+            args = [*inputs, *filters, *self.encoder_args(), '-map', '0:a:0?', '-c:a', ffmpeg.mp4_audio_codec(info),
+                    '-movflags', '+faststart', output_path]
+            log_path = os.path.join(tmp, "ffmpeg.log")
+            with open(log_path, "wb") as log:
+                process = ffmpeg.popen_progress(args, self.report_ffmpeg_progress, stderr=log)
+                if process.wait() == 0:
+                    return
+
+            with open(log_path, "rb") as f:
+                error = f.read().decode(errors='ignore').strip().splitlines()
+        raise Exception(f"FFmpeg failed: {error[-1] if error else 'unknown error'}")
+
+    @staticmethod
+    def plan_segments(keyframes, duration, count):
+        # (start, end) pieces that all start on a keyframe, each cut at the keyframe closest to an even split
+        cuts = []
+        for i in range(1, count):
+            target = duration * i / count
+            candidates = [k for k in keyframes if (cuts[-1] if cuts else 0) < k < duration]
+            if not candidates: break
+            cut = min(candidates, key=lambda k: abs(k - target))
+            if cut not in cuts: cuts.append(cut)
+        bounds = [0.0, *cuts, duration]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _watermark_segments(self, video_path, output_path):
+        info = ffmpeg.probe(video_path)
+        pieces = self.plan_segments(ffmpeg.keyframes(video_path), info['duration'], self.segments)
+        if len(pieces) < 2:
+            # one gop only, nothing to split
+            return self._watermark_ffmpeg(video_path, output_path)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            _, inputs, filters = self.overlay_args(video_path, tmp)
+            frames = [0] * len(pieces)
+            start = time.monotonic()
+
+            def encode(i):
+                begin, end = pieces[i]
+                path = os.path.join(tmp, f"segment_{i:03d}.mp4")
+                # input seeking from a keyframe is frame accurate; the last piece runs to the end of the stream
+                seek = ['-ss', f"{begin:.6f}"] + (['-t', f"{end - begin:.6f}"] if i < len(pieces) - 1 else [])
+
+                def progress(block):
+                    frames[i] = int(block.get('frame') or 0)
+                    if self.progress_callback:
+                        done = sum(frames)
+                        self.progress_callback(done, done / max(time.monotonic() - start, 1e-6))
+
+                with open(os.path.join(tmp, f"segment_{i:03d}.log"), "wb") as log:
+                    process = ffmpeg.popen_progress([*seek, *inputs, *filters, *self.encoder_args(), '-an', path],
+                                                    progress, stderr=log)
+                    if process.wait() != 0:
+                        with open(log.name, "rb") as f:
+                            error = f.read().decode(errors='ignore').strip().splitlines()
+                        raise Exception(f"FFmpeg failed on segment {i}: {error[-1] if error else 'unknown error'}")
+                return path
+
+            with ThreadPoolExecutor(max_workers=len(pieces)) as pool:
+                paths = list(pool.map(encode, range(len(pieces))))
+
+            # lossless join; the audio is copied once from the original so it never drifts at the seams
+            list_path = os.path.join(tmp, "segments.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for path in paths:
+                    f.write("file '" + path.replace("'", "'\\''") + "'\n")
+            result = ffmpeg.run(['-f', 'concat', '-safe', '0', '-i', list_path, '-i', video_path, '-map', '0:v:0', '-c:v', 'copy',
+                                 '-map', '1:a:0?', '-c:a', ffmpeg.mp4_audio_codec(info), '-movflags', '+faststart', output_path],
+                                stderr=subprocess.PIPE)
+            if result.returncode == 0:
+                return
+
+        error = result.stderr.decode(errors='ignore').strip().splitlines()
+        raise Exception(f"FFmpeg failed joining the segments: {error[-1] if error else 'unknown error'}")
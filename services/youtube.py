@@ -1,15 +1,59 @@
 import os
 import csv
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from yt_dlp import YoutubeDL
+from services.hunt import AsyncHuntEngine
+from services import telemetry
+
+
+def load_backends():
+    # yt-dlp registers hundreds of extractors on import, so it waits for the first hunt (or the prewarm)
+    from yt_dlp import YoutubeDL
+    return YoutubeDL
+
+class TermBudget:
+    # decides how deep to page into one term's results from the hit rate of the last page
+    def __init__(self, max_entries, page_size=20, min_hit_rate=0.05):
+        self.max_entries = max_entries
+        self.page_size = page_size
+        self.min_hit_rate = min_hit_rate
+        self.entries = 0
+        self.hits = 0
+        self._recent = deque(maxlen=page_size)
+
+    def record(self, hit):
+        # one call per scanned entry, once we know whether it became a lead
+        self.hits += int(hit)
+        self._recent.append(bool(hit))
+
+    def exhausted(self):
+        if self.entries >= self.max_entries: return True
+        # always scan the first page, after that keep going while the last page still pays off
+        if len(self._recent) < self.page_size: return False
+        return sum(self._recent) / len(self._recent) < self.min_hit_rate
 
 class YoutubeProspector:
-    def __init__(self, config, log_callback):
+    def __init__(self, config, log_callback, ydl_factory=None, cache=None, store=None, event_callback=None):
         self.config = config
         self.log = log_callback
+        # optional event_callback(event, data) for counters: 'probed' per video looked at, 'lead' per lead kept
+        self.event_callback = event_callback
+        # swap for a stub in tests, anything with YoutubeDL's extract_info and context manager
+        self.ydl_factory = ydl_factory or load_backends()
+        # optional MetadataCache, repeat lookups across hunts are served from disk
+        self.cache = cache
         # Calculate cutoff date in YYYYMMDD format for comparison
         self.cutoff_date = (datetime.now() - timedelta(days=int(config['days_ago']))).strftime('%Y%m%d')
         self.seen_channels = set()
+        self.known_channel_ids = set()
+        # optional LeadStore: channels found in earlier runs are skipped before any extraction
+        self.store = store
+        if store:
+            names, ids = store.known_channels()
+            self.seen_channels |= names
+            self.known_channel_ids |= ids
         self.results = []
         self.stop_flag = False 
         
@@ -19,16 +63,27 @@ class YoutubeProspector:
             'no_warnings': True,
             'extract_flat': False,
         }
+        # listing pass: only what the search page already gives us, no per-video requests
+        self.flat_opts = {**self.ydl_opts, 'extract_flat': 'in_playlist'}
+        self.detail_workers = int(config.get('detail_workers', 4))
+        # extract_info calls made here; the result pages yt-dlp fetches inside a lazy search are not visible to us
+        self.extract_calls = 0
+        self._local = threading.local()
+        self._detail_ydls = []
+        self._lock = threading.Lock()
 
-    def _validate_video(self, video):
+    def _validate_video(self, video, seen=None):
+        # seen: channel names to skip, defaults to the live seen_channels
         if not video: return False
+        seen = self.seen_channels if seen is None else seen
         
         channel = video.get('uploader')
         views = video.get('view_count', 0)
         duration = video.get('duration', 0)
         upload_date = video.get('upload_date', '00000000')
 
-        if not channel or channel in self.seen_channels: return False
+        if not channel or channel in seen: return False
+        if video.get('channel_id') in self.known_channel_ids: return False
         
         try:
             dur_min = float(self.config['duration_min'])
@@ -50,6 +105,9 @@ class YoutubeProspector:
             return
 
         filename = 'youtube_leads.csv'
+        if self.store:
+            return self._save_to_store(filename)
+
         columns = ['Channel', 'Title', 'Views', 'Channel Link', 'Date']
         
         file_exists = os.path.exists(filename)
@@ -68,15 +126,236 @@ class YoutubeProspector:
         except Exception as e:
             self.log(f"Error saving CSV: {e}")
 
+    def _save_to_store(self, filename):
+        # upsert by channel, then append only the rows the csv doesn't have yet
+        try:
+            new = self.store.upsert(self.results)
+            exported = self.store.export_csv(filename)
+            self.log(f"\n{new} new leads stored in '{self.store.path}', {exported} rows added to '{filename}'")
+            self.results = []
+        except Exception as e:
+            self.log(f"Error saving leads: {e}")
+
+    def _prefilter(self, entry, seen=None):
+        # drop what the flat listing already rules out; missing fields are left for the full check
+        if not entry: return False
+        seen = self.seen_channels if seen is None else seen
+        if self.cache:
+            self.cache.put_video(entry, complete=False)
+            # fields that never change (upload date...) may already be known from earlier hunts
+            entry = {**self.cache.fresh_fields(entry.get('id')), **{k: v for k, v in entry.items() if v is not None}}
+
+        channel = entry.get('uploader') or entry.get('channel')
+        if channel and channel in seen: return False
+        if entry.get('channel_id') in self.known_channel_ids: return False
+
+        try:
+            dur_min = float(self.config['duration_min'])
+            dur_max = float(self.config['duration_max'])
+            views_min = int(self.config['views_min'])
+            views_max = int(self.config['views_max'])
+        except ValueError:
+            return False
+
+        duration = entry.get('duration')
+        if duration is not None and not (dur_min <= duration <= dur_max): return False
+        views = entry.get('view_count')
+        if views is not None and not (views_min <= views <= views_max): return False
+        upload_date = entry.get('upload_date')
+        if upload_date and upload_date < self.cutoff_date: return False
+
+        return True
+
+    def _thread_ydl(self, kind, opts):
+        # YoutubeDL isn't thread safe, one per worker thread (and per kind of extraction)
+        ydl = getattr(self._local, kind, None)
+        if ydl is None:
+            ydl = self.ydl_factory(opts)
+            setattr(self._local, kind, ydl)
+            with self._lock:
+                self._detail_ydls.append(ydl)
+        return ydl
+
+    def _detail_ydl(self):
+        return self._thread_ydl('detail', self.ydl_opts)
+
+    def _extract(self, ydl, url, **kwargs):
+        with self._lock:
+            self.extract_calls += 1
+        # listing (lazy search) and detail calls have very different costs
+        with telemetry.span('youtube.extract_info', kind='search' if kwargs.get('process') is False else 'video'):
+            return ydl.extract_info(url, download=False, **kwargs)
+
+    def _emit(self, event, data=None):
+        if self.event_callback:
+            self.event_callback(event, data)
+
+    def _fetch_details(self, entry):
+        if self.stop_flag: return None
+        self._emit('probed')
+        if self.cache:
+            cached = self.cache.get_video(entry.get('id'))
+            telemetry.count('metadata_cache', result='hit' if cached else 'miss')
+            if cached: return cached
+
+        url = entry.get('url') or entry.get('webpage_url') or f"https://www.youtube.com/watch?v={entry.get('id')}"
+        video = self._extract(self._detail_ydl(), url)
+        if video and self.cache:
+            self.cache.put_video(video)
+        return video
+
+    def new_budget(self):
+        return TermBudget(int(self.config['search_limit_per_term']),
+                          int(self.config.get('page_size', 20)),
+                          float(self.config.get('min_hit_rate', 0.05)))
+
+    def iter_term_entries(self, ydl, term, budget=None):
+        # process=False keeps yt-dlp's search lazy: a results page is only requested
+        # when we get that far, so stopping early (goal, low hit rate) saves the requests
+        budget = budget or self.new_budget()
+        info = self._extract(ydl, f"ytsearch{budget.max_entries}:{term}", process=False)
+        if not info: return
+
+        for entry in info.get('entries') or []:
+            if self.stop_flag or budget.exhausted(): return
+            budget.entries += 1
+            yield entry
+
+    def _survivors(self, ydl, term, budget, seen=None):
+        for entry in self.iter_term_entries(ydl, term, budget):
+            if self._prefilter(entry, seen):
+                yield entry
+            else:
+                budget.record(False)
+
+    def _list_term(self, ydl, term):
+        return list(self.iter_term_entries(ydl, term, TermBudget(int(self.config['search_limit_per_term']), min_hit_rate=0)))
+
+    def _fetch_in_order(self, pool, entries):
+        # pipelined detail fetch: at most detail_workers*2 in flight, results in listing order
+        pending = deque()
+        try:
+            for entry in entries:
+                pending.append(pool.submit(self._fetch_details, entry))
+                if len(pending) >= self.detail_workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def warm(self, terms):
+        # fills the metadata cache for a list of terms ahead of a hunt, no filtering
+        if not self.cache:
+            self.log("No metadata cache to warm.")
+            return 0
+
+        warmed = 0
+        self.cache.reset_stats()
+        try:
+            with self.ydl_factory(self.flat_opts) as ydl, ThreadPoolExecutor(max_workers=self.detail_workers) as pool: # type: ignore
+                for term in terms:
+                    term = term.strip()
+                    if not term or self.stop_flag: continue
+                    try:
+                        entries = [entry for entry in self._list_term(ydl, term) if entry]
+                        for entry in entries:
+                            self.cache.put_video(entry, complete=False)
+                        warmed += sum(1 for video in pool.map(self._fetch_details, entries) if video)
+                    except Exception as e:
+                        self.log(f"Error on term '{term}': {e}")
+        finally:
+            self._close_detail_ydls()
+
+        self.log(f"Metadata cache warmed with {warmed} videos ({self._cache_summary()})")
+        return warmed
+
+    def _cache_summary(self):
+        stats = self.cache.stats()
+        return f"{stats['hits']} hits / {stats['misses']} misses"
+
+    def _build_lead(self, video, term=None):
+        raw_date = video.get('upload_date')
+        formatted_date = raw_date
+        if raw_date:
+            try:
+                dt_obj = datetime.strptime(raw_date, '%Y%m%d')
+                formatted_date = dt_obj.strftime('%d/%m/%Y')
+            except:
+                pass
+
+        channel_link = video.get('uploader_url') or video.get('channel_url')
+        if not channel_link and video.get('channel_id'):
+            channel_link = f"https://www.youtube.com/channel/{video.get('channel_id')}"
+        
+        return {
+            'Channel': video.get('uploader'),
+            'Title': video.get('title'),
+            'Views': video.get('view_count'),
+            'Channel Link': channel_link,
+            'Date': formatted_date,
+            # not csv columns, kept for the lead store
+            'Channel ID': video.get('channel_id'),
+            'Upload Date': raw_date,
+            'Term': term
+        }
+
+    def _accept(self, video, term=None):
+        # returns True once the lead goal is reached
+        if not self._validate_video(video): return False
+
+        video_data = self._build_lead(video, term)
+        self.results.append(video_data)
+        self.seen_channels.add(video_data['Channel'])
+        
+        self.log(f"TARGET: {video_data['Channel']}")
+        self.log(f"   {video_data['Views']} views | {video_data['Date']}")
+        self._emit('lead', video_data)
+
+        if len(self.results) >= int(self.config['total_goal']):
+            self.log("\nTotal lead goal reached!")
+            return True
+        return False
+
+    def _close_detail_ydls(self):
+        for ydl in self._detail_ydls:
+            close = getattr(ydl, 'close', None)
+            if close: close()
+        self._detail_ydls = []
+
     def search(self, terms):
         self.log(f"STARTING PROFESSIONAL HUNT")
         self.log(f"Videos from: {datetime.strptime(self.cutoff_date, '%Y%m%d').strftime('%m/%d/%Y')}")
         self.log(f"View Filter: Min {self.config['views_min']} | Max {self.config['views_max']}")
         self.log("-" * 40)
 
+        if self.cache:
+            self.cache.reset_stats()
+
+        try:
+            concurrency = int(self.config.get('concurrent_terms', 1))
+            if concurrency > 1:
+                # several terms in flight at once, leads still committed in term order
+                AsyncHuntEngine(self, concurrency).run(terms)
+            else:
+                self._search_sequential(terms)
+        finally:
+            self._close_detail_ydls()
+
+        self.log(f"\nExtractor calls: {self.extract_calls}")
+        if self.cache:
+            self.log(f"Metadata cache: {self._cache_summary()}")
+        self.save_csv()
+        self.log(f"\nHunt finished. Total new leads: {len(self.results)}")
+
+    def _search_sequential(self, terms):
         goal_reached = False
+        # prefilter and paging decisions use the channels known at the start, like the async engine,
+        # so both engines scan the same results; _accept still dedupes against the live set
+        seen = frozenset(self.seen_channels)
 
-        with YoutubeDL(self.ydl_opts) as ydl: # type: ignore
+        with self.ydl_factory(self.flat_opts) as ydl, ThreadPoolExecutor(max_workers=self.detail_workers) as pool: # type: ignore
             for term in terms:
                 if goal_reached or self.stop_flag: break
                 
@@ -85,54 +364,23 @@ class YoutubeProspector:
 
                 self.log(f"\nProbing niche: '{term}'...")
                 
+                budget = self.new_budget()
                 try:
-                    limit = self.config['search_limit_per_term']
-                    query = f"ytsearch{limit}:{term}"
-                    info = ydl.extract_info(query, download=False)
+                    # phase 1: flat listing pages streamed in, prefiltered as they arrive
+                    survivors = self._survivors(ydl, term, budget, seen)
 
-                    if 'entries' not in info: continue
-
-                    for video in info['entries']: # type: ignore
+                    # phase 2: full extraction only for the survivors, consumed in listing order
+                    for video in self._fetch_in_order(pool, survivors):
                         if self.stop_flag: break
-                        if self._validate_video(video):
-                            
-                            raw_date = video.get('upload_date')
-                            formatted_date = raw_date
-                            if raw_date:
-                                try:
-                                    dt_obj = datetime.strptime(raw_date, '%Y%m%d')
-                                    formatted_date = dt_obj.strftime('%d/%m/%Y')
-                                except:
-                                    pass
-
-                            channel_link = video.get('uploader_url') or video.get('channel_url')
-                            if not channel_link and video.get('channel_id'):
-                                channel_link = f"https://www.youtube.com/channel/{video.get('channel_id')}"
-                            
-                            video_data = {
-                                'Channel': video.get('uploader'),
-                                'Title': video.get('title'),
-                                'Views': video.get('view_count'),
-                                'Channel Link': channel_link,
-                                'Date': formatted_date
-                            }
-                            
-                            self.results.append(video_data)
-                            self.seen_channels.add(video_data['Channel'])
-                            
-                            self.log(f"TARGET: {video_data['Channel']}")
-                            self.log(f"   {video_data['Views']} views | {video_data['Date']}")
-
-                            if len(self.results) >= int(self.config['total_goal']):
-                                self.log("\nTotal lead goal reached!")
-                                goal_reached = True
-                                break
+                        budget.record(self._validate_video(video, seen))
+                        if self._accept(video, term):
+                            goal_reached = True
+                            break
+
+                    self.log(f"   scanned {budget.entries} results, {budget.hits} matches")
                 
                 except Exception as e:
                     self.log(f"Error on term '{term}': {e}")
                     continue
 
-        self.save_csv()
-        self.log(f"\nHunt finished. Total new leads: {len(self.results)}")
-
         # im too lazy to document all of this
\ No newline at end of file
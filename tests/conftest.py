@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+
+# the repo has no packaging, tests import it from the checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from services.youtube import YoutubeProspector
+
+
+class StubYoutubeDL:
+    # enough of YoutubeDL for the prospector: lazy search listings and per-video extraction.
+    # every instance records when two threads use it at the same time
+    def __init__(self, factory, opts):
+        self.factory = factory
+        self.opts = opts
+        self._busy = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.factory.closed += 1
+
+    def _step(self):
+        if not self._busy.acquire(blocking=False):
+            with self.factory.lock:
+                self.factory.overlaps += 1
+            self._busy.acquire()
+        try:
+            time.sleep(self.factory.latency + random.uniform(0, self.factory.jitter))
+        finally:
+            self._busy.release()
+
+    def _listing(self, term, count):
+        # what a flat search page carries: no upload date, the rest needs a detail request
+        for video in self.factory.catalog.get(term, [])[:count]:
+            self._step()
+            yield {'id': video['id'], 'url': f"https://www.youtube.com/watch?v={video['id']}", 'title': video['title'],
+                   'uploader': video['uploader'], 'channel_id': video['channel_id'],
+                   'duration': video['duration'], 'view_count': video['view_count']}
+
+    def extract_info(self, url, download=False, process=True):
+        if url.startswith('ytsearch'):
+            count, term = url[len('ytsearch'):].split(':', 1)
+            with self.factory.lock:
+                self.factory.users.setdefault(id(self), set()).add(term)
+            return {'entries': self._listing(term, int(count))}
+        with self.factory.lock:
+            self.factory.details += 1
+        self._step()
+        return dict(self.factory.videos[url.rsplit('=', 1)[1]])
+
+
+class StubFactory:
+    def __init__(self, catalog, latency=0.001, jitter=0.0):
+        self.catalog = catalog
+        self.videos = {v['id']: v for videos in catalog.values() for v in videos}
+        self.latency = latency
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.overlaps = 0
+        self.closed = 0
+        # per-video (detail) extractions
+        self.details = 0
+        # instance id -> terms it listed
+        self.users = {}
+
+    def __call__(self, opts):
+        return StubYoutubeDL(self, opts)
+
+
+def make_catalog(terms, per_term=30):
+    # deterministic videos; channels repeat across terms so dedup and commit order matter
+    recent = (datetime.now() - timedelta(days=3)).strftime('%Y%m%d')
+    catalog = {}
+    for t, term in enumerate(terms):
+        videos = []
+        for i in range(per_term):
+            videos.append({
+                'id': f"{term}-{i}",
+                'title': f"{term} video {i}",
+                'uploader': f"channel-{(t * 7 + i) % 23}",
+                'channel_id': f"UC{(t * 7 + i) % 23:04d}",
+                'view_count': 5000 + (i * 1379) % 40000,
+                'duration': 60 + (i * 53) % 1200,
+                'upload_date': recent,
+            })
+        catalog[term] = videos
+    return catalog
+
+
+TERMS = ['a', 'b', 'c', 'd', 'e', 'f']
+
+
+def hunt(config, factory, concurrent_terms, prefilter=True):
+    prospector = YoutubeProspector({**config, 'concurrent_terms': concurrent_terms}, lambda line: None, ydl_factory=factory)
+    prospector.save_csv = lambda: None
+    if not prefilter:
+        # reference run: nothing is ruled out from the listing, every result gets a detail request
+        prospector._prefilter = lambda entry, seen=None: bool(entry)
+    prospector.search(TERMS)
+    return prospector
+
+
+def leads(prospector):
+    return [(lead['Channel'], lead['Title'], lead['Term']) for lead in prospector.results]
+
+
+@pytest.fixture
+def hunt_config():
+    return {
+        'days_ago': 30, 'duration_min': 120, 'duration_max': 1200, 'views_min': 10000, 'views_max': 40000,
+        'search_limit_per_term': 30, 'total_goal': 1000, 'detail_workers': 2, 'page_size': 10, 'min_hit_rate': 0,
+    }
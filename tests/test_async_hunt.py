@@ -0,0 +1,26 @@
+from conftest import TERMS, StubFactory, hunt, leads, make_catalog
+
+
+def test_async_probes_never_share_a_listing_ydl(hunt_config):
+    factory = StubFactory(make_catalog(TERMS))
+    hunt(hunt_config, factory, concurrent_terms=3)
+    assert factory.overlaps == 0
+    assert all(len(terms) == 1 for terms in factory.users.values())
+
+
+def test_async_hunt_finds_the_same_leads_as_the_sequential_one(hunt_config):
+    catalog = make_catalog(TERMS)
+    sequential = hunt(hunt_config, StubFactory(catalog), concurrent_terms=1)
+    assert sequential.results
+    for concurrency in (2, 3, 6):
+        assert leads(hunt(hunt_config, StubFactory(catalog), concurrency)) == leads(sequential)
+
+
+def test_async_hunt_is_deterministic_with_paging_budget_and_goal(hunt_config):
+    config = {**hunt_config, 'min_hit_rate': 0.3, 'total_goal': 12}
+    catalog = make_catalog(TERMS)
+    expected = leads(hunt(config, StubFactory(catalog), concurrent_terms=1))
+    assert len(expected) == 12
+    for _ in range(5):
+        # random latencies change which probe finishes first, not the result
+        assert leads(hunt(config, StubFactory(catalog, latency=0, jitter=0.003), concurrent_terms=4)) == expected
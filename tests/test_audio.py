@@ -0,0 +1,121 @@
+import io
+
+import pytest
+
+from services import ffmpeg
+from services.audio import AudioProcessor, AudioTooLargeError, merge_segments
+
+
+class FakeProcess:
+    def __init__(self, data):
+        self.stdout = io.BytesIO(data)
+        self.returncode = None
+        self.killed = False
+
+    def wait(self):
+        self.returncode = -9 if self.killed else 0
+
+    def kill(self):
+        self.killed = True
+
+
+@pytest.fixture
+def fake_ffmpeg(monkeypatch):
+    runs = []
+
+    def popen(args, **kwargs):
+        runs.append(FakeProcess(bytes(range(256)) * 40))
+        return runs[-1]
+    monkeypatch.setattr(ffmpeg, 'popen', popen)
+    return runs
+
+
+def test_short_audio_is_one_chunk():
+    assert AudioProcessor.plan_chunks(100.0, [], 300.0) == [(0.0, 100.0)]
+
+
+def test_chunks_cut_in_the_last_usable_silence():
+    silences = [(100.0, 110.0), (250.0, 260.0), (280.0, 290.0), (500.0, 520.0)]
+    chunks = AudioProcessor.plan_chunks(700.0, silences, 300.0)
+    assert chunks == [(0.0, 285.0), (285.0, 510.0), (510.0, 700.0)]
+    # contiguous, cover everything, none too long
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+    assert all(end - start <= 300.0 for start, end in chunks)
+
+
+def test_hard_cut_overlaps_when_there_is_no_silence():
+    chunks = AudioProcessor.plan_chunks(650.0, [], 300.0, overlap=1.0)
+    assert chunks == [(0.0, 300.0), (299.0, 599.0), (598.0, 650.0)]
+
+
+def test_merge_offsets_and_renumbers():
+    merged = merge_segments([
+        (0.0, [{'start': 0.0, 'end': 4.0, 'text': ' one'}, {'start': 4.0, 'end': 8.0, 'text': ' two'}]),
+        (10.0, [{'start': 0.0, 'end': 3.0, 'text': ' three'}]),
+    ])
+    assert [(s['id'], s['start'], s['end'], s['text']) for s in merged] == [
+        (0, 0.0, 4.0, ' one'), (1, 4.0, 8.0, ' two'), (2, 10.0, 13.0, ' three')]
+
+
+def test_merge_drops_segments_inside_the_overlap():
+    merged = merge_segments([
+        (0.0, [{'start': 0.0, 'end': 300.0, 'text': ' first chunk'}]),
+        (299.0, [{'start': 0.0, 'end': 0.9, 'text': ' chunk'}, {'start': 0.9, 'end': 5.0, 'text': ' next words'}]),
+    ])
+    assert [s['text'] for s in merged] == [' first chunk', ' next words']
+
+
+def test_merge_dedups_words_heard_twice_at_the_seam():
+    merged = merge_segments([
+        (0.0, [{'start': 0.0, 'end': 300.0, 'text': ' what are you doing'}]),
+        (299.0, [{'start': 0.0, 'end': 4.0, 'text': ' you doing today'}]),
+    ])
+    assert merged[1]['text'] == ' today'
+    assert merged[1]['start'] == 300.0
+
+
+def test_merge_dedups_a_seam_segment_starting_exactly_at_the_last_end():
+    merged = merge_segments([
+        (0.0, [{'start': 0.0, 'end': 300.0, 'text': ' what are you doing'}]),
+        (299.0, [{'start': 1.0, 'end': 4.0, 'text': ' doing today'}]),
+    ])
+    assert " ".join(s['text'].strip() for s in merged) == "what are you doing today"
+
+
+def test_merge_keeps_repeated_words_inside_one_chunk():
+    merged = merge_segments([
+        (0.0, [{'start': 0.0, 'end': 2.0, 'text': ' very'}, {'start': 2.0, 'end': 4.0, 'text': ' very good'}]),
+    ])
+    assert [s['text'] for s in merged] == [' very', ' very good']
+
+
+def test_single_transcription_keeps_zero_length_and_touching_segments():
+    segments = [{'start': 0.0, 'end': 2.0, 'text': ' Hello.'}, {'start': 2.0, 'end': 2.0, 'text': ' Yes.'},
+                {'start': 2.0, 'end': 4.0, 'text': ' Yes, sure.'}, {'start': 3.5, 'end': 3.9, 'text': ' Sure.'}]
+    merged = merge_segments([(0.0, segments)])
+    assert [(s['start'], s['end'], s['text']) for s in merged] == [(s['start'], s['end'], s['text']) for s in segments]
+
+
+def test_overlap_bigger_than_the_chunk_still_terminates():
+    chunks = AudioProcessor.plan_chunks(10.0, [], 0.8)
+    assert chunks[0][0] == 0.0 and chunks[-1][1] == 10.0
+    assert all(b[0] > a[0] for a, b in zip(chunks, chunks[1:]))
+
+
+def test_small_audio_stays_in_memory(fake_ffmpeg, tmp_path):
+    spill = tmp_path / "audio.mp3"
+    assert AudioProcessor.extract_audio_bytes("v.mp4", max_bytes=100_000, spill_path=str(spill)) == bytes(range(256)) * 40
+    assert not spill.exists()
+
+
+def test_large_audio_spills_the_same_stream_to_disk(fake_ffmpeg, tmp_path):
+    spill = tmp_path / "audio.mp3"
+    assert AudioProcessor.extract_audio_bytes("v.mp4", max_bytes=1000, block_size=512, spill_path=str(spill)) is None
+    assert spill.read_bytes() == bytes(range(256)) * 40
+    assert len(fake_ffmpeg) == 1 and not fake_ffmpeg[0].killed
+
+
+def test_large_audio_without_a_spill_file_raises(fake_ffmpeg):
+    with pytest.raises(AudioTooLargeError):
+        AudioProcessor.extract_audio_bytes("v.mp4", max_bytes=1000, block_size=512)
+    assert fake_ffmpeg[0].killed
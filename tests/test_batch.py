@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+import batch
+
+
+def test_output_dir_clashes_are_refused(tmp_path):
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "clip.mp4").write_bytes(b"x")
+    (tmp_path / "a" / "other.mp4").write_bytes(b"x")
+    watermark = tmp_path / "wm.png"
+    watermark.write_bytes(b"png")
+    videos = batch.collect_videos([str(tmp_path / "a"), str(tmp_path / "b")])
+
+    clashes = batch.output_clashes(videos, str(tmp_path / "out"))
+    assert list(clashes.values()) == [[str(tmp_path / "a" / "clip.mp4"), str(tmp_path / "b" / "clip.mp4")]]
+    assert batch.main([str(tmp_path / "a"), str(tmp_path / "b"), '-w', str(watermark), '-o', str(tmp_path / "out")]) == 2
+    assert not (tmp_path / "out").exists()
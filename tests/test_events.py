@@ -0,0 +1,44 @@
+from UI.events import LogView
+
+
+class FakeTextbox:
+    # the bits of a tk Text widget LogView uses; indexes are "line.col" with 1-based lines
+    def __init__(self):
+        self.content = ""
+
+    def configure(self, **kwargs):
+        pass
+
+    def see(self, index):
+        pass
+
+    def insert(self, index, text):
+        assert index == "end"
+        self.content += text
+
+    def delete(self, start, end):
+        if end == "end":
+            self.content = ""
+            return
+        assert start == "1.0"
+        lines = self.content.split("\n")
+        self.content = "\n".join(lines[int(end.split(".")[0]) - 1:])
+
+    def lines(self):
+        return self.content.count("\n")
+
+
+def test_view_is_capped_with_multiline_messages():
+    box = FakeTextbox()
+    view = LogView(box, max_lines=100, spill_dir=None)
+    for i in range(5000):
+        view.append([f"\nProbing niche: '{i}'..."] if i % 2 else [f"TARGET: {i}", f"   {i} views"])
+    assert box.lines() == 100
+    assert box.content.endswith("TARGET: 4998\n   4998 views\n\nProbing niche: '4999'...\n")
+
+
+def test_bursts_bigger_than_the_view_keep_the_tail():
+    box = FakeTextbox()
+    view = LogView(box, max_lines=10, spill_dir=None)
+    view.append([f"line {i}" for i in range(50)])
+    assert box.content.split("\n")[:-1] == [f"line {i}" for i in range(40, 50)]
@@ -0,0 +1,96 @@
+import time
+import threading
+
+import pytest
+
+from benchmarks.mock_groq import MockGroqHandler, serve
+from services.groq_client import GroqClient, RateLimitScheduler
+
+
+class FlakyHandler(MockGroqHandler):
+    # the first `failures` requests get `status`, the rest succeed
+    failures = 0
+    status = 503
+    calls = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        with FlakyHandler.lock:
+            FlakyHandler.calls += 1
+            failing = FlakyHandler.failures > 0
+            FlakyHandler.failures -= int(failing)
+        FlakyHandler.rate_limit_rate = 1.0 if failing and self.status == 429 else 0.0
+        FlakyHandler.error_rate = 1.0 if failing and self.status == 503 else 0.0
+        super().do_POST()
+
+
+@pytest.fixture
+def mock_groq():
+    # the client itself needs the groq sdk and httpx, the scheduler doesn't
+    pytest.importorskip("groq")
+    pytest.importorskip("httpx")
+    FlakyHandler.calls = 0
+    FlakyHandler.retry_after = 0
+    server = serve(port=0, handler=FlakyHandler)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def client_for(url, **kwargs):
+    return GroqClient("test-key", base_url=url, base_delay=0.01, max_delay=0.05, **kwargs)
+
+
+@pytest.mark.parametrize('status', [503, 429])
+def test_retries_until_the_request_goes_through(mock_groq, status):
+    FlakyHandler.failures, FlakyHandler.status = 2, status
+    client = client_for(mock_groq)
+    try:
+        response = client.transcribe("a.mp3", b"\0" * 40000, "whisper-large-v3", "en")
+    finally:
+        client.close()
+    assert response.segments
+    assert FlakyHandler.calls == 3
+    stats = client.stats.snapshot()
+    assert (stats['requests'], stats['retries'], stats['failures']) == (1, 2, 0)
+
+
+def test_gives_up_after_max_retries(mock_groq):
+    FlakyHandler.failures, FlakyHandler.status = 10, 503
+    client = client_for(mock_groq, max_retries=2)
+    try:
+        with pytest.raises(pytest.importorskip("groq").APIStatusError):
+            client.transcribe("a.mp3", b"\0" * 4000, "whisper-large-v3", "en")
+    finally:
+        client.close()
+    assert FlakyHandler.calls == 3
+    assert client.stats.snapshot()['failures'] == 1
+
+
+def test_concurrent_callers_take_spaced_slots():
+    scheduler = RateLimitScheduler()
+    # 4 requests left in a 0.5s window: one every 0.1s, not a burst when the window opens
+    scheduler.update({'x-ratelimit-remaining-requests': '4', 'x-ratelimit-reset-requests': '0.5s'})
+    times = []
+    lock = threading.Lock()
+
+    def call():
+        scheduler.wait()
+        with lock:
+            times.append(time.monotonic())
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    times.sort()
+    assert times[0] - start >= 0.09
+    assert all(b - a >= 0.08 for a, b in zip(times, times[1:]))
+
+
+def test_retry_after_holds_every_caller():
+    scheduler = RateLimitScheduler(min_interval=0.05)
+    scheduler.update({'retry-after': '0.2'})
+    start = time.monotonic()
+    scheduler.wait()
+    scheduler.wait()
+    assert time.monotonic() - start >= 0.24
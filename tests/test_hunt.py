@@ -0,0 +1,19 @@
+from conftest import TERMS, StubFactory, hunt, leads, make_catalog
+
+
+def test_known_channels_are_never_leads(hunt_config):
+    catalog = make_catalog(TERMS)
+    first = hunt(hunt_config, StubFactory(catalog), concurrent_terms=3)
+    channels = {lead['Channel'] for lead in first.results}
+    assert len(channels) == len(first.results)
+
+
+def test_flat_prefilter_keeps_the_leads_of_a_full_extraction(hunt_config):
+    catalog = make_catalog(TERMS)
+    full = StubFactory(catalog)
+    expected = leads(hunt(hunt_config, full, concurrent_terms=1, prefilter=False))
+    assert full.details == len(TERMS) * hunt_config['search_limit_per_term']
+    for concurrency in (1, 3):
+        flat = StubFactory(catalog)
+        assert leads(hunt(hunt_config, flat, concurrency)) == expected
+        assert flat.details < full.details
@@ -0,0 +1,105 @@
+import json
+import time
+import threading
+
+from services.cache import file_digest
+import pytest
+
+from services.jobs import JobQueue, QueueBusy, DEFAULT_HANDLERS, DEFAULT_LIMITS, DONE, QUEUED, RUNNING
+
+
+def test_one_watermark_encode_at_a_time(tmp_path):
+    release = threading.Event()
+    running, peak = [], []
+    lock = threading.Lock()
+
+    def blocking_encode(job, report):
+        with lock:
+            running.append(job.id)
+            peak.append(len(running))
+        release.wait(5)
+        with lock:
+            running.remove(job.id)
+
+    queue = JobQueue({'watermark': blocking_encode}, limits={'watermark': DEFAULT_LIMITS['watermark']},
+                     journal_path=str(tmp_path / "jobs.jsonl")).start()
+    first, second = queue.submit('watermark', {}), queue.submit('watermark', {})
+    deadline = time.monotonic() + 5
+    while not running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # give the dispatcher a chance to (wrongly) start the second one
+    time.sleep(0.2)
+    states = {queue.status(first)['state'], queue.status(second)['state']}
+    release.set()
+    assert queue.wait(timeout=5)
+    queue.shutdown()
+    assert states == {RUNNING, QUEUED}
+    assert max(peak) == 1
+
+
+def test_watermark_records_the_source_hash_before_encoding(tmp_path):
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"source")
+    journal = tmp_path / "jobs.jsonl"
+    queue = JobQueue(DEFAULT_HANDLERS, journal_path=str(journal)).start()
+    # the missing watermark image fails the encode, the checkpoint is written before that
+    job_id = queue.submit('watermark', {'video_path': str(video), 'watermark_path': str(tmp_path / "missing.png")})
+    queue.wait(job_id, timeout=10)
+    queue.shutdown()
+
+    records = [json.loads(line) for line in journal.read_text().splitlines()]
+    running = [r for r in records if r['state'] == RUNNING]
+    assert running[-1]['payload']['source_hash'] == file_digest(str(video))
+
+
+def test_resumed_watermark_is_skipped_once_the_file_was_replaced(tmp_path):
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"source")
+    source_hash = file_digest(str(video))
+    # crash after the replace, before the done state reached the journal
+    video.write_bytes(b"watermarked")
+    journal = tmp_path / "jobs.jsonl"
+    job = {'id': 'abc', 'kind': 'watermark', 'state': RUNNING, 'priority': 0, 'attempts': 1,
+           'payload': {'video_path': str(video), 'watermark_path': str(tmp_path / "wm.png"), 'source_hash': source_hash}}
+    journal.write_text(json.dumps(job) + "\n")
+
+    queue = JobQueue(DEFAULT_HANDLERS, journal_path=str(journal)).start()
+    assert queue.wait('abc', timeout=10)
+    status = queue.status('abc')
+    queue.shutdown()
+    assert status['state'] == DONE
+    assert status['result']['skipped'] is True
+    assert video.read_bytes() == b"watermarked"
+
+
+def journal_ids(journal):
+    return {json.loads(line)['id'] for line in journal.read_text().splitlines()}
+
+
+def test_one_process_owns_the_journal(tmp_path):
+    journal = tmp_path / "jobs.jsonl"
+    handlers = {'noop': lambda job, report: None}
+    owner = JobQueue(handlers, journal_path=str(journal))
+    with pytest.raises(QueueBusy):
+        JobQueue(handlers, journal_path=str(journal))
+    owner.shutdown()
+    # free again once the owner is gone
+    JobQueue(handlers, journal_path=str(journal)).shutdown()
+
+
+def test_read_only_queue_leaves_the_owners_journal_alone(tmp_path):
+    journal = tmp_path / "jobs.jsonl"
+    handlers = {'noop': lambda job, report: None}
+    owner = JobQueue(handlers, journal_path=str(journal))
+    a = owner.submit('noop', {})
+    status = JobQueue(handlers, journal_path=str(journal), read_only=True)
+    assert [j['id'] for j in status.jobs()] == [a]
+    with pytest.raises(QueueBusy):
+        status.submit('noop', {})
+    with pytest.raises(QueueBusy):
+        status.start()
+    # the owner's append handle still points at the journal on disk
+    b = owner.submit('noop', {})
+    owner.shutdown()
+    assert journal_ids(journal) == {a, b}
+    assert {j['state'] for j in JobQueue(handlers, journal_path=str(journal), read_only=True).jobs()} == {QUEUED}
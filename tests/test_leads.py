@@ -0,0 +1,41 @@
+import csv
+
+from services.leads import LeadStore, CSV_COLUMNS
+
+
+def write_legacy_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_new_store_imports_the_legacy_csv_as_exported(tmp_path):
+    legacy = tmp_path / "youtube_leads.csv"
+    write_legacy_csv(legacy, [
+        {'Channel': 'Old One', 'Title': 't1', 'Views': '12000', 'Channel Link': 'https://www.youtube.com/channel/UC0001', 'Date': '01/02/2025'},
+        {'Channel': 'Old Two', 'Title': 't2', 'Views': '', 'Channel Link': 'https://www.youtube.com/@oldtwo', 'Date': '03/04/2025'},
+    ])
+    store = LeadStore(str(tmp_path / "leads.db"), legacy_csv=str(legacy))
+
+    names, ids = store.known_channels()
+    assert names == {'Old One', 'Old Two'}
+    assert ids == {'UC0001'}
+    assert {r['upload_date'] for r in store.query()} == {'20250201', '20250403'}
+    # nothing is appended to the csv again
+    assert store.export_csv(str(legacy)) == 0
+
+    # a lead for a known channel is not new, a new channel is exported once
+    assert store.upsert([{'Channel': 'Old One', 'Channel ID': 'UC0001', 'Title': 'again'}]) == 0
+    assert store.upsert([{'Channel': 'Fresh', 'Channel ID': 'UC0002', 'Title': 'new'}]) == 1
+    assert store.export_csv(str(legacy)) == 1
+    store.close()
+
+
+def test_existing_store_does_not_reimport(tmp_path):
+    legacy = tmp_path / "youtube_leads.csv"
+    LeadStore(str(tmp_path / "leads.db"), legacy_csv=str(legacy)).close()
+    write_legacy_csv(legacy, [{'Channel': 'Later', 'Title': 't', 'Views': '1', 'Channel Link': '', 'Date': ''}])
+    store = LeadStore(str(tmp_path / "leads.db"), legacy_csv=str(legacy))
+    assert store.known_channels() == (set(), set())
+    store.close()
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from services.cache import file_digest, TranscriptionCache
+from services.manifest import Manifest, CURRENT, PENDING, CHANGED, LOCKED, SUBTITLES
+
+SETTINGS = {'watermark': 'abc', 'opacity': 0.3, 'preset': 'medium', 'crf': 23,
+            'subtitles': {'formats': ['srt'], 'model': 'whisper-large-v3', 'language': 'en'}}
+OTHER = {**SETTINGS, 'crf': 18}
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return Manifest(str(tmp_path / "manifest.json"))
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def process_in_place(manifest, video, settings=SETTINGS):
+    # what a batch run does for one in-place file
+    source_hash = file_digest(str(video))
+    srt = os.path.splitext(str(video))[0] + ".srt"
+    manifest.begin(str(video), source_hash, str(video), settings, [srt])
+    video.write_bytes(b"watermarked")
+    with open(srt, 'w') as f:
+        f.write("1\n")
+    manifest.record(str(video), source_hash, str(video), settings, [srt])
+    return source_hash, srt
+
+
+def test_out_of_place_states(manifest, tmp_path):
+    video = write(tmp_path / "v.mp4", b"source")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    output = str(out_dir / "v.mp4")
+    assert manifest.check(video, output, SETTINGS) == PENDING
+
+    write(out_dir / "v.mp4", b"watermarked")
+    manifest.record(video, file_digest(video), output, SETTINGS)
+    assert manifest.check(video, output, SETTINGS) == CURRENT
+    # reloaded from disk
+    assert Manifest(manifest.path).check(video, output, SETTINGS) == CURRENT
+
+    assert manifest.check(video, output, OTHER) == CHANGED
+    os.remove(output)
+    assert manifest.check(video, output, SETTINGS) == PENDING
+    write(tmp_path / "v.mp4", b"new source")
+    assert manifest.check(video, output, SETTINGS) == CHANGED
+
+
+def test_in_place_states(manifest, tmp_path):
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"source")
+    process_in_place(manifest, video)
+    assert manifest.check(str(video), str(video), SETTINGS) == CURRENT
+    # redoing it with other settings would stack a second watermark
+    assert manifest.check(str(video), str(video), OTHER) == LOCKED
+    # replaced by a new recording
+    video.write_bytes(b"another source")
+    assert manifest.check(str(video), str(video), SETTINGS) == CHANGED
+
+
+def test_in_place_missing_subtitles_never_reprocess_the_video(manifest, tmp_path):
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"source")
+    _, srt = process_in_place(manifest, video)
+    os.remove(srt)
+    assert manifest.check(str(video), str(video), SETTINGS) == SUBTITLES
+
+
+def test_interrupted_in_place_run(manifest, tmp_path):
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"source")
+    manifest.begin(str(video), file_digest(str(video)), str(video), SETTINGS)
+    # died before the replace: the source is intact, do it again
+    assert Manifest(manifest.path).check(str(video), str(video), SETTINGS) == PENDING
+
+    # died after the replace but before the record: the result is there, don't watermark it twice
+    video.write_bytes(b"watermarked")
+    resumed = Manifest(manifest.path)
+    assert resumed.check(str(video), str(video), SETTINGS) == CURRENT
+    assert resumed.entry(str(video))['state'] == 'done'
+
+
+def test_missing_subtitles_restored_from_the_transcription_cache(manifest, tmp_path):
+    pytest.importorskip("dotenv")
+    from batch import restore_subtitles
+
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"source")
+    source_hash, srt = process_in_place(manifest, video)
+    os.remove(srt)
+    cache = TranscriptionCache(str(tmp_path / "cache"))
+    cache.put(cache.key_for_hash(source_hash, 'whisper-large-v3', 'en'), [{'start': 0.0, 'end': 1.0, 'text': ' hi'}])
+
+    assert restore_subtitles(str(video), manifest, SETTINGS, cache)
+    assert os.path.exists(srt)
+    assert video.read_bytes() == b"watermarked"
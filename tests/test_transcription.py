@@ -0,0 +1,25 @@
+import pytest
+
+from services.transcription import TranscriptionBackend, GroqBackend, LocalWhisperBackend, get_backend
+
+
+def test_incomplete_backend_fails_on_construction():
+    class Partial(TranscriptionBackend):
+        name = 'partial'
+
+        def iter_transcribe(self, video_path):
+            return iter(())
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_backends_have_distinct_cache_models():
+    groq = get_backend('groq', api_key='key')
+    local = get_backend('local', model_size='base', threads=2)
+    assert isinstance(groq, GroqBackend) and isinstance(local, LocalWhisperBackend)
+    # groq keeps the plain model name so older cache entries still match
+    assert groq.model_id == 'whisper-large-v3'
+    assert local.model_id == 'faster-whisper-base-int8'
+    with pytest.raises(ValueError):
+        get_backend('nope')
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import argparse
+
+import config
+from config import WATERMARK_FILENAME
+from services.jobs import JobQueue, QueueBusy, DEFAULT_HANDLERS, FINISHED
+from services import telemetry
+
+
+def print_event(job, event, data):
+    name = job['payload'].get('video_path') or ", ".join(job['payload'].get('terms', []))
+    if event == 'state':
+        extra = f": {job['error']}" if data == 'failed' else ""
+        print(f"[{job['kind']}:{job['id']}] {data} {name}{extra}")
+    elif event == 'log':
+        print(f"[{job['kind']}:{job['id']}] {data}")
+    elif event == 'profile':
+        print(f"[{job['kind']}:{job['id']}] profile saved to {data}")
+
+
+def cmd_submit(args, queue):
+    secrets = {'api_key': os.getenv("GROQ_API_KEY", "")}
+    for video in args.videos:
+        if args.kind == 'watermark':
+            payload = {'video_path': os.path.abspath(video), 'watermark_path': os.path.abspath(args.watermark), 'engine': args.engine,
+                       'segments': args.segments}
+        else:
+            payload = {'video_path': os.path.abspath(video), 'formats': args.formats, 'backend': args.transcriber,
+                       'model': args.whisper_model, 'threads': args.whisper_threads, 'compute_type': config.WHISPER_COMPUTE_TYPE}
+        if args.profile:
+            payload['profile'] = args.profile
+        job_id = queue.submit(args.kind, payload, args.priority, secrets)
+        print(f"queued {args.kind} job {job_id} for {video}")
+
+
+def cmd_status(args, queue):
+    jobs = sorted(queue.jobs(), key=lambda j: j['created'])
+    if not jobs:
+        print("No pending jobs.")
+    for job in jobs:
+        name = job['payload'].get('video_path') or job['payload'].get('terms')
+        print(f"{job['id']}  {job['kind']:<10} {job['state']:<10} prio={job['priority']}  {name}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless runner for the job queue shared with the GUI.")
+    parser.add_argument('--trace', action='store_true', help="write stage timings to .cache/trace.jsonl and .cache/metrics.prom")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('run', help="resume the journal and run every pending job")
+    sub.add_parser('status', help="list pending jobs")
+
+    submit = sub.add_parser('submit', help="queue jobs and run them")
+    submit.add_argument('kind', choices=('watermark', 'subtitle'))
+    submit.add_argument('videos', nargs='+')
+    submit.add_argument('-p', '--priority', type=int, default=0, help="higher runs first")
+    submit.add_argument('-w', '--watermark', default=WATERMARK_FILENAME)
+    submit.add_argument('--engine', choices=('moviepy', 'ffmpeg'), default='moviepy')
+    submit.add_argument('--segments', type=int, default=1, help="parallel keyframe-split encode (watermark jobs)")
+    submit.add_argument('--formats', nargs='+', choices=('srt', 'vtt', 'json'), default=['srt'])
+    submit.add_argument('--transcriber', choices=('groq', 'local'), default=config.TRANSCRIPTION_BACKEND,
+                        help="subtitle backend, local needs faster-whisper (default: %(default)s)")
+    submit.add_argument('--whisper-model', default=config.WHISPER_MODEL, help="local model size (default: %(default)s)")
+    submit.add_argument('--whisper-threads', type=int, default=config.WHISPER_THREADS, help="local cpu threads (default: all cores)")
+    submit.add_argument('--no-wait', action='store_true', help="only queue, run later with 'run'")
+    submit.add_argument('--profile', choices=('cprofile', 'sampling'), help="profile each job into .cache/profiles")
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        telemetry.enable()
+
+    if args.command == 'status':
+        # only reads the journal, works while the gui or another worker runs the queue
+        return cmd_status(args, JobQueue(DEFAULT_HANDLERS, read_only=True))
+
+    try:
+        queue = JobQueue(DEFAULT_HANDLERS, on_event=print_event)
+    except QueueBusy as e:
+        print(f"{e} Close the app (or the other worker) first; 'status' works meanwhile.")
+        return 2
+    try:
+        if args.command == 'submit':
+            cmd_submit(args, queue)
+            if args.no_wait:
+                return 0
+
+        pending = len(queue.jobs(states=('queued',)))
+        print(f"Running {pending} pending job(s)...")
+        start = time.perf_counter()
+        queue.start()
+        queue.wait()
+        failed = [j for j in queue.jobs(states=FINISHED) if j['state'] == 'failed']
+        print(f"Finished in {time.perf_counter() - start:.1f}s, {len(failed)} failed.")
+        return 1 if failed else 0
+    except KeyboardInterrupt:
+        # interrupted jobs stay in the journal and resume on the next run
+        print("Interrupted, pending jobs will resume on the next run.")
+        return 130
+    finally:
+        queue.shutdown(wait=False)
+        if args.trace:
+            telemetry.disable()
+
+
+if __name__ == "__main__":
+    sys.exit(main())